@@ -0,0 +1,214 @@
+# Balancing sweeps: many headless games over a grid of game constants, spread over all cores.
+# Run it from the src folder, e.g.
+#   python batch.py results.csv --param MONSTER_SPAWN_INTERVAL=[5000,10000] --param "MONSTER_SPEED_RANGE=[[2,4],[3,5]]" --runs 50
+# Every finished game is written to the CSV file right away, running the same command again after an interruption
+# only plays the games that are not in the file yet.
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+try:
+    from . import main as game
+except ImportError:
+    import main as game
+
+TUNABLE = ("MONSTER_SPAWN_INTERVAL", "DOOR_LIFETIME", "INITIAL_MONSTER_LIMIT", "MONSTER_SPEED_RANGE",
+           "COIN_SPAWN_INTERVAL", "PLAYER_SPEED", "COIN_SPEED")
+MAX_SECONDS = 600  # Games still running after this much simulated time are stopped and counted as survived
+RESULT_COLUMNS = ("survival_ms", "score", "coins", "ticks", "game_over", "wall_seconds")
+DIRECTION_KEYS = (game.pygame.K_LEFT, game.pygame.K_RIGHT, game.pygame.K_UP, game.pygame.K_DOWN)
+
+
+# Policies play one tick of a headless game by setting its held keys and queueing shots.
+# They are looked up by name in the worker processes, so a sweep only has to send the name along.
+def idle_policy(state, rng):
+    pass
+
+
+def random_policy(state, rng):
+    if state.sim_clock.ticks % 20 == 0:
+        state.input.held = set(rng.sample(DIRECTION_KEYS, 2))
+        state.input.hold(rng.choice((game.pygame.K_a, game.pygame.K_d)))
+    if rng.random() < 0.02:
+        state.input.press(game.pygame.K_SPACE)
+
+
+def flee_policy(state, rng):
+    """Runs away from the closest monster and shoots now and then."""
+    player = state.player
+    held = set()
+    closest = min(state.monsters, key=lambda m: abs(m.x - player.x) + abs(m.y - player.y), default=None)
+    if closest is not None:
+        held.add(game.pygame.K_LEFT if closest.x > player.x else game.pygame.K_RIGHT)
+        held.add(game.pygame.K_UP if closest.y > player.y else game.pygame.K_DOWN)
+    held.add(game.pygame.K_d)
+    state.input.held = held
+    if rng.random() < 0.01:
+        state.input.press(game.pygame.K_SPACE)
+
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "flee": flee_policy,
+}
+
+
+def expand_grid(grid):
+    """Every combination of the grid values, as a list of {constant: value} dicts."""
+    for name in grid:
+        if name not in TUNABLE:
+            raise ValueError("%s is not a tunable constant, pick one of %s" % (name, ", ".join(TUNABLE)))
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def make_tasks(grid, policies=("random",), runs=10, seed=0):
+    tasks = []
+    for params in expand_grid(grid):
+        for policy in policies:
+            if policy not in POLICIES:
+                raise ValueError("Unknown policy %s" % policy)
+            for run_seed in range(seed, seed + runs):
+                tasks.append((run_key(params, policy, run_seed), params, policy, run_seed))
+    return tasks
+
+
+def run_key(params, policy, seed):
+    return "%s|%s|%d" % (json.dumps(params, sort_keys=True, separators=(",", ":")), policy, seed)
+
+
+def simulate(task, max_seconds=MAX_SECONDS):
+    """Plays one game with the task's constants and policy, the constants are put back afterwards."""
+    key, params, policy, seed = task
+    saved = {name: getattr(game, name) for name in params}
+    try:
+        for name, value in params.items():
+            setattr(game, name, tuple(value) if isinstance(saved[name], tuple) else value)
+        state = game.Game(headless=True, seed=seed)
+        play = POLICIES[policy]
+        rng = random.Random(seed)
+        max_ticks = max_seconds * state.sim_clock.tick_rate
+        start = time.perf_counter()
+        while state.state == game.GAME_RUNNING and state.sim_clock.ticks < max_ticks:
+            play(state, rng)
+            state.handle_events()
+            state.step()
+        wall_time = time.perf_counter() - start
+    finally:
+        for name, value in saved.items():
+            setattr(game, name, value)
+    return {
+        "run": key,
+        "policy": policy,
+        "seed": seed,
+        "params": params,
+        "survival_ms": state.survival_time(),
+        "score": state.score,
+        "coins": state.player.coins,
+        "ticks": state.sim_clock.ticks,
+        "game_over": state.state == game.GAME_OVER,
+        "wall_seconds": round(wall_time, 4),
+    }
+
+
+def simulate_task(args):
+    return simulate(*args)
+
+
+def completed_runs(path):
+    """The run keys already in a results file, so an interrupted sweep can carry on."""
+    try:
+        with open(path, newline="") as file:
+            return {row["run"] for row in csv.DictReader(file)}
+    except FileNotFoundError:
+        return set()
+
+
+def csv_columns(grid):
+    return ["run", "policy", "seed"] + sorted(grid) + list(RESULT_COLUMNS)
+
+
+def csv_row(result):
+    row = dict(result)
+    for name, value in row.pop("params").items():
+        row[name] = json.dumps(value)
+    return row
+
+
+def run_sweep(path, grid, policies=("random",), runs=10, seed=0, processes=None, max_seconds=MAX_SECONDS,
+              progress=None):
+    """Plays every grid combination, policy and seed on a process pool and appends the results to the CSV
+    file at path as they come in. Runs that are already in the file are skipped. Returns the number of games played."""
+    columns = csv_columns(grid)
+    # A sweep interrupted before its first game leaves a file with just the header, it is resumed like any other
+    has_header = os.path.exists(path) and os.path.getsize(path) > 0
+    if has_header:
+        with open(path, newline="") as file:
+            header = next(csv.reader(file), [])
+        if header != columns:
+            raise ValueError("%s holds results of a different sweep, its columns are %s" % (path, header))
+    done = completed_runs(path)
+    tasks = [task for task in make_tasks(grid, policies, runs, seed) if task[0] not in done]
+    if not tasks:
+        return 0
+    with open(path, "a", newline="") as file:
+        writer = csv.DictWriter(file, columns)
+        if not has_header:
+            writer.writeheader()
+        # SDL turns SIGTERM into a quit event, the workers need it back or the pool could never stop them
+        with multiprocessing.Pool(processes, signal.signal, (signal.SIGTERM, signal.SIG_DFL)) as pool:
+            # Small chunks keep every core busy even when some games last much longer than others
+            chunks = max(1, len(tasks) // ((processes or os.cpu_count() or 1) * 16))
+            results = pool.imap_unordered(simulate_task, [(task, max_seconds) for task in tasks], chunks)
+            for played, result in enumerate(results, 1):
+                writer.writerow(csv_row(result))
+                file.flush()
+                if progress is not None:
+                    progress(played, len(tasks))
+    return len(tasks)
+
+
+def parse_param(text):
+    name, _, values = text.partition("=")
+    values = json.loads(values)
+    return name, values if isinstance(values, list) else [values]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Robot Survival balancing sweeps")
+    parser.add_argument("output", help="CSV file the results are appended to")
+    parser.add_argument("--param", action="append", default=[], type=parse_param, metavar="NAME=JSON_LIST",
+                        help="values to try for one constant, e.g. DOOR_LIFETIME=[3000,5000]")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), help="player policies to play with")
+    parser.add_argument("--runs", type=int, default=10, help="games per combination and policy")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the others count up from it")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--max-seconds", type=int, default=MAX_SECONDS, help="simulated seconds before a game is stopped")
+    args = parser.parse_args(argv)
+
+    def progress(played, total):
+        print("\r%d/%d games" % (played, total), end="", flush=True)
+
+    try:
+        played = run_sweep(args.output, dict(args.param), args.policy or ["random"], args.runs, args.seed,
+                           args.processes, args.max_seconds, progress)
+    except ValueError as error:
+        parser.error(str(error))
+    print("\n%d games played, results in %s" % (played, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,511 @@
+# Benchmarks for the game, run them from the src folder, e.g. "python bench.py collisions"
+# SDL runs with the dummy video driver so everything also works on headless machines.
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+try:
+    from . import main as game
+except ImportError:
+    import main as game
+
+ENTITY_COUNTS = (10, 100, 1000, 10000)
+# CI runners can keep their own baseline file instead of the one in the repo
+BASELINE_FILE = os.environ.get("ROBOT_BENCH_BASELINE",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json"))
+REGRESSION_THRESHOLD = 0.25  # A phase fails when its mean or p95 is this much slower than the baseline
+MIN_REGRESSION_MS = 0.05  # and at least this much slower, so timer noise on tiny phases does not fail a run
+PHASES = ("update", "collision", "draw", "flip", "frame")
+ENTITY_BYTES_BUDGET = 256  # Heap bytes one door, monster or coin may take, --check fails the memory report above it
+STARTUP_BUDGET_MS = 1000  # From starting to import the game to its first presented frame, in a fresh interpreter
+# name: (doors, monsters, coins)
+FRAME_SCENARIOS = {
+    "start": (1, 3, 3),
+    "busy": (10, 100, 100),
+    "crowded": (20, 500, 500),
+}
+
+
+def make_monsters(count, rng):
+    monsters = []
+    for _ in range(count):
+        monster = game.Monster(rng.randint(0, game.WIDTH), rng.randint(0, game.HEIGHT), "random")
+        monsters.append(monster)
+    return monsters
+
+
+def make_coins(count, rng):
+    return [game.Coin(rng.uniform(0, game.WIDTH), rng.uniform(0, game.HEIGHT), rng.randrange(360)) for _ in range(count)]
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_collisions(counts=ENTITY_COUNTS, repeat=3, seed=0):
+    """Coin against monster queries, the old linear scan against the spatial grid.
+    Half of the entities are monsters and half are coins."""
+    rows = []
+    for count in counts:
+        rng = random.Random(seed)
+        monsters = make_monsters(count // 2, rng)
+        coins = make_coins(count - count // 2, rng)
+
+        def brute_force():
+            return sum(1 for coin in coins if coin.check_collision(monsters))
+
+        def grid():
+            index = game.SpatialGrid()
+            index.rebuild(monsters)
+            return sum(1 for coin in coins if coin.check_collision(index.query_near(coin.x, coin.y)))
+
+        brute_time, brute_hits = timed(brute_force, 1 if count > 1000 else repeat)
+        grid_time, grid_hits = timed(grid, repeat)
+        assert brute_hits == grid_hits, "grid and brute force disagree"
+        rows.append({
+            "entities": count,
+            "brute_force_ms": brute_time * 1000,
+            "grid_ms": grid_time * 1000,
+            "speedup": brute_time / grid_time if grid_time else float("inf"),
+            "hits": grid_hits,
+        })
+    return rows
+
+
+def bench_entity_backends(counts=ENTITY_COUNTS, ticks=60, seed=0):
+    """Game.update_entities with the per-object methods and with the numpy arrays, half monsters and half coins.
+    Nothing spawns or dies during the measured ticks, so the arrays are loaded once like in a calm stretch of a game."""
+    rows = []
+    for count in counts:
+        times = {}
+        for backend in ("objects", "numpy"):
+            rng = random.Random(seed)
+            state = game.Game(entity_backend=backend, headless=True)
+            for _ in range(count // 2):
+                state.monsters.acquire(rng.randint(0, game.WIDTH - 40), rng.randint(0, game.HEIGHT - 40),
+                                       rng.choice(["random", "chase"]), rng)
+            for _ in range(count - count // 2):
+                state.coins.acquire(rng.uniform(0, game.WIDTH), rng.uniform(0, game.HEIGHT), rng.randrange(360))
+            state.update_entities()
+
+            def run():
+                for _ in range(ticks):
+                    state.update_entities()
+
+            times[backend], _ = timed(run, 3)
+        rows.append({
+            "entities": count,
+            "objects_ms_per_tick": times["objects"] * 1000 / ticks,
+            "numpy_ms_per_tick": times["numpy"] * 1000 / ticks,
+            "speedup": times["objects"] / times["numpy"],
+        })
+    return rows
+
+
+def bench_flow_field(counts=(3, 30, 300, 3000), ticks=120, seed=0):
+    """Chasing monsters steering with the flow field, and the field rebuild itself, for a growing number of chasers.
+    The player walks across the screen so the field is rebuilt every time it enters another cell."""
+    rows = []
+    obstacles = [(320, 160, 40, 400), (720, 160, 40, 400)]
+    for count in counts:
+        rng = random.Random(seed)
+        monsters = [game.Monster(rng.randint(0, game.WIDTH - 40), rng.randint(0, game.HEIGHT - 40), "chase")
+                    for _ in range(count)]
+        field = game.FlowField(obstacles=obstacles)
+        rebuild_time = 0.0
+        clock = time.perf_counter
+        start = clock()
+        for tick in range(ticks):
+            player_x, player_y = tick * game.WIDTH // ticks, game.HEIGHT // 2
+            built = clock()
+            field.update(player_x, player_y)
+            rebuild_time += clock() - built
+            for monster in monsters:
+                monster.update(player_x, player_y, field=field)
+        total = clock() - start
+        rows.append({
+            "chasers": count,
+            "field_ms_per_tick": rebuild_time * 1000 / ticks,
+            "steer_us_per_chaser": (total - rebuild_time) * 1e6 / (ticks * count),
+            "rebuilds": field.builds,
+        })
+    return rows
+
+
+def bench_draw(counts=(1000, 10000), repeat=5, seed=0):
+    """Drawing a layer of monsters the way Game.render did, a draw() call and a blit per monster, against one
+    batched blits call from the sprite atlas. Runs on the dummy display, the blending work is the same for both."""
+    game.pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    window = game.pygame.Surface((game.WIDTH, game.HEIGHT)).convert()
+    game.ATLAS.build()
+    rows = []
+    for count in counts:
+        monsters = make_monsters(count, random.Random(seed))
+
+        def single():
+            rects = []
+            for monster in monsters:
+                rects.append(monster.draw(window, 0.5))
+            return rects
+
+        def batched():
+            return game.ATLAS.draw_layer(window, "monster.png", game.interpolated(monsters, 0.5))
+
+        single_time, single_rects = timed(single, repeat)
+        batched_time, batched_rects = timed(batched, repeat)
+        assert single_rects == batched_rects
+        rows.append({
+            "sprites": count,
+            "per_entity_ms": single_time * 1000,
+            "atlas_blits_ms": batched_time * 1000,
+            "sprites_per_s": count / batched_time,
+            "speedup": single_time / batched_time,
+        })
+    return rows
+
+
+def bench_snapshot(counts=(10, 100, 1000), repeat=20, seed=0):
+    """Game.snapshot and Game.restore for a game with the given number of doors, monsters and coins each."""
+    rows = []
+    for count in counts:
+        rng = random.Random(seed)
+        state = game.Game(headless=True, seed=seed)
+        populate(state, count, count, count, rng)
+        target = game.Game(headless=True)
+        snapshot_time, data = timed(state.snapshot, repeat)
+        restore_time, _ = timed(lambda: target.restore(data), repeat)
+        rows.append({
+            "entities": 3 * count,
+            "bytes": len(data),
+            "snapshot_us": snapshot_time * 1e6,
+            "restore_us": restore_time * 1e6,
+        })
+    return rows
+
+
+def bench_memory(counts=(100, 1000, 10000), seed=0):
+    """Heap bytes per entity type measured with tracemalloc, for a game holding count entities of each type.
+    Sprites are loaded before measuring, they are shared by every entity and are not counted per entity."""
+    state = game.Game(headless=True, seed=seed)
+    rows = []
+    tracemalloc.start()
+    try:
+        for count in counts:
+            rng = random.Random(seed)
+            pools = (("door", state.doors, lambda: (rng.uniform(0, game.WIDTH), 0, 0)),
+                     ("monster", state.monsters, lambda: (rng.uniform(0, game.WIDTH), 0, "random", rng)),
+                     ("coin", state.coins, lambda: (rng.uniform(0, game.WIDTH), 0, rng.randrange(360))))
+            for name, pool, arguments in pools:
+                pool.clear()
+                pool.free = []
+                before = tracemalloc.get_traced_memory()[0]
+                for _ in range(count):
+                    pool.acquire(*arguments())
+                used = tracemalloc.get_traced_memory()[0] - before
+                rows.append({"type": name, "entities": count, "bytes_per_entity": used / count,
+                             "type_kb": used / 1024, "heap_kb": tracemalloc.get_traced_memory()[0] / 1024})
+    finally:
+        tracemalloc.stop()
+    return rows
+
+
+def bench_recursion(ticks=300, monsters=50, seed=0):
+    """tmc.reflect.test_recursion around headless game ticks, per detector backend, against playing them plainly.
+    "watch all" looks at every Python function like the Bdb detector did, "watch game" only at the game module."""
+    try:
+        from tmc import reflect
+    except ImportError:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from tmc import reflect
+
+    def play():
+        state = game.Game(headless=True, seed=seed)
+        state.game_over = lambda: None
+        rng = random.Random(seed)
+        for _ in range(ticks):
+            populate(state, 5, monsters, monsters, rng)
+            state.step()
+
+    backend = "monitoring" if reflect.MONITORING else "profile"
+    runs = (("plain", play),
+            ("bdb", lambda: reflect.test_recursion(play, backend="bdb")),
+            (backend + " watch all", lambda: reflect.test_recursion(play, backend=backend)),
+            (backend + " watch game", lambda: reflect.test_recursion(play, targets=[game], backend=backend)))
+    rows = []
+    plain = None
+    for name, run in runs:
+        seconds, _ = timed(run, 3)
+        plain = plain or seconds
+        rows.append({"detector": name, "ms": seconds * 1000, "slowdown": seconds / plain})
+    return rows
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+game = main.Game()
+game.draw()
+presented = time.perf_counter()
+print(imported - start, presented - imported)
+"""
+
+
+def bench_startup(repeat=5):
+    """Cold start in a fresh interpreter for every run: importing the game, then making a Game and presenting
+    its first frame. The best run is reported against STARTUP_BUDGET_MS."""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        imported, presented = (float(value) * 1000 for value in output.split())
+        if best is None or imported + presented < sum(best):
+            best = (imported, presented)
+    return [{
+        "import_ms": best[0],
+        "first_frame_ms": best[1],
+        "total_ms": sum(best),
+        "budget_ms": float(STARTUP_BUDGET_MS),
+    }]
+
+
+def bench_pool(ticks=600, fired_per_tick=50, live=2000, seed=0):
+    """Coins fired and collected every tick: plain lists with copies and list.remove against the entity pool.
+    Both paths fire the same coins and collect the same randomly picked ones, only the container work is measured."""
+    rng = random.Random(seed)
+    script = [[(rng.uniform(0, game.WIDTH), rng.uniform(0, game.HEIGHT), rng.randrange(360)) for _ in range(fired_per_tick)]
+              for _ in range(ticks)]
+
+    def plain_lists():
+        picker = random.Random(seed)
+        coins = []
+        for fired in script:
+            for x, y, angle in fired:
+                coins.append(game.Coin(x, y, angle))
+            collected = set(picker.sample(range(len(coins)), max(0, len(coins) - live)))
+            for index, coin in enumerate(coins[:]):
+                if index in collected:
+                    coins.remove(coin)
+        return len(coins)
+
+    def pooled():
+        picker = random.Random(seed)
+        coins = game.EntityPool(game.Coin)
+        for fired in script:
+            for x, y, angle in fired:
+                coins.acquire(x, y, angle)
+            collected = set(picker.sample(range(len(coins)), max(0, len(coins) - live)))
+            for index, coin in enumerate(coins):
+                if index in collected:
+                    coins.release(coin)
+            coins.compact()
+        return coins
+
+    plain_time, plain_count = timed(plain_lists, 3)
+    pooled_time, pool = timed(pooled, 3)
+    assert plain_count == len(pool)
+    stats = pool.stats()
+    operations = stats["allocated"] + stats["reused"] + stats["released"]
+    return [{
+        "fire_and_collect": operations,
+        "lists_ops_per_s": operations / plain_time,
+        "pool_ops_per_s": operations / pooled_time,
+        "speedup": plain_time / pooled_time,
+        "allocated": stats["allocated"],
+        "allocs_avoided": stats["allocations_avoided"],
+    }]
+
+
+def summarize(samples):
+    return {
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p95_ms": game.percentile(samples, 0.95) * 1000,
+        "p99_ms": game.percentile(samples, 0.99) * 1000,
+    }
+
+
+def populate(state, doors, monsters, coins, rng):
+    """Tops the game up to the wanted entity counts, so killed monsters and collected coins are replaced."""
+    while len(state.doors) < doors:
+        x, y = state.get_random_border_position()
+        state.doors.acquire(x, y, state.get_ticks())
+    while len(state.monsters) < monsters:
+        state.monsters.acquire(rng.randint(0, game.WIDTH - 40), rng.randint(0, game.HEIGHT - 40),
+                               rng.choice(["random", "chase"]), rng)
+    while len(state.coins) < coins:
+        state.coins.acquire(rng.uniform(0, game.WIDTH - 40), rng.uniform(0, game.HEIGHT - 40), rng.randrange(360))
+
+
+def bench_frame(doors=10, monsters=100, coins=100, frames=300, seed=0):
+    """Times the update, collision, draw and flip phases of every frame of a running game."""
+    rng = random.Random(seed)
+    state = game.Game(seed=seed)
+    state.start_game()
+    # Monsters reaching the player must not end the measured game
+    state.game_over = lambda: None
+    clock = time.perf_counter
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(frames):
+        populate(state, doors, monsters, coins, rng)
+        start = clock()
+        state.update_movement()
+        moved = clock()
+        state.resolve_collisions()
+        collided = clock()
+        state.render()
+        drawn = clock()
+        state.renderer.present()
+        presented = clock()
+        state.sim_clock.tick()
+        samples["update"].append(moved - start)
+        samples["collision"].append(collided - moved)
+        samples["draw"].append(drawn - collided)
+        samples["flip"].append(presented - drawn)
+        samples["frame"].append(presented - start)
+    return {phase: summarize(times) for phase, times in samples.items()}
+
+
+def bench_frame_suite(frames=300, scenarios=FRAME_SCENARIOS):
+    return {name: bench_frame(*counts, frames=frames) for name, counts in scenarios.items()}
+
+
+def reference_ms(repeat=5):
+    """Times a fixed piece of Python and surface work that does not depend on the game code. Baselines store it
+    next to the scenario timings, so a run on a faster or slower machine is scaled before it is compared."""
+    surface = game.pygame.Surface((game.WIDTH, game.HEIGHT))
+    sprite = game.pygame.Surface((40, 40))
+
+    def work():
+        rng = random.Random(0)
+        points = sorted((rng.random(), rng.random()) for _ in range(20000))
+        for x, y in points[:5000]:
+            surface.blit(sprite, (x * game.WIDTH, y * game.HEIGHT))
+        surface.fill((0, 0, 0))
+
+    best, _ = timed(work, repeat)
+    return best * 1000
+
+
+def compare_to_baseline(results, baseline, threshold=REGRESSION_THRESHOLD, min_ms=MIN_REGRESSION_MS, scale=1.0):
+    """Returns a message for every scenario phase that got slower than the baseline allows.
+    The baseline timings are multiplied by scale first, the ratio of this machine's reference time to the baseline's."""
+    regressions = []
+    for name, phases in results.items():
+        for phase, stats in phases.items():
+            expected = baseline.get(name, {}).get(phase)
+            if expected is None:
+                continue
+            for key in ("mean_ms", "p95_ms"):
+                allowed = expected[key] * scale
+                limit = max(allowed * (1 + threshold), allowed + min_ms * scale)
+                if stats[key] > limit:
+                    regressions.append("%s %s %s: %.3f ms, baseline %.3f ms" % (name, phase, key, stats[key], allowed))
+    return regressions
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Returns the baseline scenarios and the reference time they were recorded with."""
+    try:
+        with open(path) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        return {}, None
+    return baseline["scenarios"], baseline["reference_ms"]
+
+
+def save_baseline(results, reference, path=BASELINE_FILE):
+    with open(path, "w") as file:
+        json.dump({"reference_ms": reference, "scenarios": results}, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def print_frame_results(results):
+    rows = []
+    for name, phases in results.items():
+        for phase, stats in phases.items():
+            rows.append(dict({"scenario": name, "phase": phase}, **stats))
+    print_rows(rows)
+
+
+def print_rows(rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    print("  ".join("%14s" % column for column in columns))
+    for row in rows:
+        print("  ".join("%14.3f" % row[c] if isinstance(row[c], float) else "%14s" % row[c] for c in columns))
+
+
+BENCHMARKS = {
+    "collisions": bench_collisions,
+    "draw": bench_draw,
+    "entities": bench_entity_backends,
+    "flowfield": bench_flow_field,
+    "memory": bench_memory,
+    "pool": bench_pool,
+    "recursion": bench_recursion,
+    "snapshot": bench_snapshot,
+    "startup": bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Robot Survival benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["frame"])
+    parser.add_argument("--frames", type=int, default=300, help="frames per frame benchmark scenario")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="JSON file with the frame baselines")
+    parser.add_argument("--save-baseline", action="store_true", help="store the frame results as the new baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error when a frame phase regressed or startup went over its budget")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    if args.benchmark == "startup":
+        rows = bench_startup()
+        print_rows(rows)
+        if args.check and rows[0]["total_ms"] > STARTUP_BUDGET_MS:
+            print("REGRESSION startup took %.1f ms, budget %d ms" % (rows[0]["total_ms"], STARTUP_BUDGET_MS))
+            return 1
+        return 0
+    if args.benchmark == "memory":
+        rows = bench_memory()
+        print_rows(rows)
+        over = [row for row in rows if row["bytes_per_entity"] > ENTITY_BYTES_BUDGET]
+        for row in over:
+            print("REGRESSION %s takes %.0f bytes, budget %d" % (row["type"], row["bytes_per_entity"], ENTITY_BYTES_BUDGET))
+        return 1 if args.check and over else 0
+    if args.benchmark != "frame":
+        print_rows(BENCHMARKS[args.benchmark]())
+        return 0
+    results = bench_frame_suite(args.frames)
+    reference = reference_ms()
+    print_frame_results(results)
+    print("reference workload %.3f ms" % reference)
+    if args.save_baseline:
+        save_baseline(results, reference, args.baseline)
+    if args.check:
+        baseline, baseline_reference = load_baseline(args.baseline)
+        scale = reference / baseline_reference if baseline_reference else 1.0
+        regressions = compare_to_baseline(results, baseline, args.threshold, scale=scale)
+        for message in regressions:
+            print("REGRESSION " + message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
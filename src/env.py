@@ -0,0 +1,154 @@
+# Training environments for bots, in the style of Gymnasium but without depending on it.
+#   env = GameEnv(seed=0)
+#   observation, info = env.reset()
+#   observation, reward, terminated, truncated, info = env.step(action)
+# VectorGameEnv steps many independent games in one call and returns batched numpy arrays.
+# Nothing is drawn, the games run on the simulated clock as fast as the CPU allows.
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+try:
+    from . import main as game
+except ImportError:
+    import main as game
+
+import numpy as np
+
+MAX_MONSTERS = 16  # Observation slots per entity type, the closest ones to the player fill them
+MAX_DOORS = 4
+MAX_COINS = 16
+MAX_SECONDS = 600  # Episodes still running after this much simulated time are truncated
+SURVIVAL_REWARD = 0.01  # Reward for every tick survived, each monster hit with a coin is worth 1
+MOVES = ((), (game.pygame.K_UP,), (game.pygame.K_DOWN,), (game.pygame.K_LEFT,), (game.pygame.K_RIGHT,),
+         (game.pygame.K_UP, game.pygame.K_LEFT), (game.pygame.K_UP, game.pygame.K_RIGHT),
+         (game.pygame.K_DOWN, game.pygame.K_LEFT), (game.pygame.K_DOWN, game.pygame.K_RIGHT))
+AIMS = ((), (game.pygame.K_a,), (game.pygame.K_d,))
+
+
+# Action n is move n // 6, aim n // 2 % 3 and shoot n % 2, so there are 9 * 3 * 2 = 54 of them
+def make_actions():
+    actions = []
+    for move in MOVES:
+        for aim in AIMS:
+            for shoot in (False, True):
+                actions.append((frozenset(move + aim), shoot))
+    return actions
+
+
+ACTIONS = make_actions()
+ACTION_COUNT = len(ACTIONS)
+# Player x, y, cos and sin of the aim, coins in hand, then x, y, present for every entity slot
+OBSERVATION_SIZE = 5 + 3 * (MAX_MONSTERS + MAX_DOORS + MAX_COINS)
+
+
+def encode_action(move=0, aim=0, shoot=False):
+    return (move * len(AIMS) + aim) * 2 + int(shoot)
+
+
+def closest(entities, x, y, count):
+    if len(entities) <= count:
+        return list(entities)
+    return sorted(entities, key=lambda entity: (entity.x - x) ** 2 + (entity.y - y) ** 2)[:count]
+
+
+def observe(state, out):
+    """Writes the observation of a game into the float32 array out, positions are scaled to 0..1."""
+    player = state.player
+    cos, sin = game.AIM_DIRECTIONS[player.aim]
+    values = [player.x / game.WIDTH, player.y / game.HEIGHT, cos, sin, player.coins / 10]
+    for entities, slots in ((state.monsters, MAX_MONSTERS), (state.doors, MAX_DOORS), (state.coins, MAX_COINS)):
+        nearest = closest(entities, player.x, player.y, slots)
+        for entity in nearest:
+            values += (entity.x / game.WIDTH, entity.y / game.HEIGHT, 1.0)
+        values += (0.0, 0.0, 0.0) * (slots - len(nearest))
+    out[:] = values
+    return out
+
+
+class GameEnv:
+    def __init__(self, seed=None, max_seconds=MAX_SECONDS, entity_backend="objects"):
+        self.game = game.Game(entity_backend=entity_backend, headless=True, seed=seed)
+        self.max_ticks = max_seconds * self.game.sim_clock.tick_rate
+        self.start_tick = 0
+        self.observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+        self.action_count = ACTION_COUNT
+        self.observation_size = OBSERVATION_SIZE
+
+    def reset(self, seed=None):
+        state = self.game
+        if seed is not None:
+            state.seeds.seed(seed)
+        state.input.held = set()
+        state.input.queue = []
+        state.reset_game()
+        self.start_tick = state.sim_clock.ticks
+        return observe(state, self.observation).copy(), {"session_seed": state.session_seed}
+
+    def step(self, action):
+        state = self.game
+        held, shoot = ACTIONS[action]
+        state.input.held = held
+        if shoot:
+            state.shoot_coin()
+        score = state.score
+        state.step()
+        terminated = state.state == game.GAME_OVER
+        truncated = not terminated and state.sim_clock.ticks - self.start_tick >= self.max_ticks
+        reward = state.score - score + (0.0 if terminated else SURVIVAL_REWARD)
+        info = {"score": state.score, "survival_ms": state.survival_time()}
+        return observe(state, self.observation).copy(), reward, terminated, truncated, info
+
+
+# N independent games stepped together. Finished games are reset right away and their last observation
+# is handed over in info["final_observation"], like Gymnasium's vector environments do.
+class VectorGameEnv:
+    def __init__(self, count, seed=None, max_seconds=MAX_SECONDS, entity_backend="objects"):
+        self.envs = [GameEnv(None if seed is None else seed + i, max_seconds, entity_backend) for i in range(count)]
+        self.observations = np.zeros((count, OBSERVATION_SIZE), dtype=np.float32)
+        self.rewards = np.zeros(count, dtype=np.float32)
+        self.terminated = np.zeros(count, dtype=bool)
+        self.truncated = np.zeros(count, dtype=bool)
+        self.action_count = ACTION_COUNT
+        self.observation_size = OBSERVATION_SIZE
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self, seed=None):
+        for i, env in enumerate(self.envs):
+            env.reset(None if seed is None else seed + i)
+            observe(env.game, self.observations[i])
+        return self.observations.copy(), {}
+
+    def step(self, actions):
+        observations, rewards = self.observations, self.rewards
+        final = {}
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, rewards[i], terminated, truncated, _ = env.step(action)
+            self.terminated[i], self.truncated[i] = terminated, truncated
+            if terminated or truncated:
+                final[i] = observation
+                observation, _ = env.reset()
+            observations[i] = observation
+        info = {"final_observation": final} if final else {}
+        return observations.copy(), rewards.copy(), self.terminated.copy(), self.truncated.copy(), info
+
+
+def measure_throughput(count=64, steps=200, seed=0):
+    """Steps per second of a vector environment playing random actions."""
+    import time
+    envs = VectorGameEnv(count, seed)
+    envs.reset()
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, ACTION_COUNT, size=(steps, count))
+    start = time.perf_counter()
+    for tick_actions in actions:
+        envs.step(tick_actions)
+    return count * steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print("%.0f steps per second" % measure_throughput())
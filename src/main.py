@@ -6,12 +6,34 @@
 # Thank you for your time, and have a great day!
 
 
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
 import pygame
 import math
+import contextlib
+import json
 import random
+import struct
+import time
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the array entity backend
+    np = None
+
+# Importing the game has no side effects, pygame is only started when something needs it. Only the display
+# (which brings the event queue along) and the font modules are used, pygame.init() would also open audio,
+# joysticks and the rest.
+def init_pygame(display=True):
+    if display and not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.font.get_init():
+        pygame.font.init()
 
-# Initialize pygame
-pygame.init()
 
 # Constants
 WIDTH, HEIGHT = 1080, 720
@@ -19,6 +41,7 @@ BACKGROUND_COLOR = (139, 0, 0)
 PLAYER_SPEED = 3
 ARROW_LENGTH = 40
 ROTATION_SPEED = 3
+AIM_STEPS_PER_DEGREE = 4  # The aim moves on a grid of quarter degrees, fine enough for every usual tick rate
 MONSTER_SPAWN_INTERVAL = 10000  # Monsters take a bit to spawn, adjust if you want a more hardcore experience
 DOOR_LIFETIME = 5000
 INITIAL_MONSTER_LIMIT = 3
@@ -26,6 +49,17 @@ MONSTER_SPEED_RANGE = (2, 4)
 COIN_SPEED = 5
 COIN_SPAWN_INTERVAL = 10000
 COIN_SPAWN_OFFSET = 40
+FPS = 60  # Render cap of the window, 0 draws as fast as the machine can
+TICK_RATE = 60  # Simulation ticks per second, independent of the render rate
+MOVEMENT_RATE = 60  # Speeds above are in pixels per tick at this rate and get scaled to the tick rate
+MAX_FRAME_MS = 250  # A longer hitch is not caught up, the simulation just falls behind
+HITBOX_SIZE = 20  # Half-width of the headshot box, see the disclaimer above
+GRID_CELL_SIZE = 64
+LINEAR_COLLISION_LIMIT = 16  # Up to this many monsters, collisions skip the spatial grid
+FLOW_CELL_SIZE = 40
+COLLISION_MODE = "swept"  # "swept" tests whole movements against sprite hitboxes, "point" is the original headshot check
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+SPRITES = ("robot.png", "door.png", "monster.png", "coin.png")
 # Double line breaks are intentional, text was a bit crowded otherwise
 STORY_STRING = """You are a trans-human who turned into a robot. But that had a cost.\n
 Now, those who lent you money to achieve this goal are coming to get their money back, AS GHOSTS!!!!\n
@@ -33,7 +67,974 @@ It is your duty to repay your debts and enjoy life as a robot. In more "gamey" t
 MECHANICS_STRING = """Use arrow keys to move, A and D to aim, and SPACE to shoot coins.\n
 Coins can be used to hit the ghosts and send them to debt-collector heaven, they will also spawn at random locations every 10 seconds and can be collected by the robot.\n
 Totally on purpose *ahem* coins will only be collected or eliminate ghosts with headshots, so AIM FOR THE HEAD!!!\nGood luck!!"""
-FONT = pygame.font.Font(None, 36)
+TEXT_COLOR = (255, 255, 255)
+TEXT_CACHE_SIZE = 128
+PROFILE_HISTORY = 240  # Frames kept per timing scope
+PROFILE_OVERLAY_KEY = pygame.K_F3
+
+# Sprites are decoded once and shared by every entity, spawning mid-game must never touch the disk
+class AssetCache:
+    def __init__(self, directory=ASSET_DIR):
+        self.directory = directory
+        self.images = {}
+        self.hitboxes = {}
+        self.converted = set()
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, name):
+        self.images[name] = pygame.image.load(os.path.join(self.directory, name))
+        self.loads += 1
+        return self.convert(name)
+
+    # convert_alpha needs a display mode, without one the decoded surface is kept as is
+    def convert(self, name):
+        if name not in self.converted and pygame.display.get_surface() is not None:
+            self.images[name] = self.images[name].convert_alpha()
+            self.converted.add(name)
+        return self.images[name]
+
+    def preload(self, names=SPRITES):
+        for name in names:
+            if name in self.images:
+                self.convert(name)
+            else:
+                self.load(name)
+
+    def get(self, name):
+        image = self.images.get(name)
+        if image is None:
+            self.misses += 1
+            return self.load(name)
+        self.hits += 1
+        return image
+
+    # The box around the visible pixels of a sprite, relative to its top left corner
+    def hitbox(self, name):
+        box = self.hitboxes.get(name)
+        if box is None:
+            image = self.images.get(name) or self.load(name)
+            box = self.hitboxes[name] = image.get_bounding_rect()
+        return box
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.loads = self.hits = self.misses = 0
+
+
+ASSETS = AssetCache()
+
+
+# All sprites packed side by side into one surface, so a whole layer of entities is drawn with a single
+# Surface.blits call that picks each sprite out of the atlas by its source rect.
+class SpriteAtlas:
+    def __init__(self, assets=ASSETS, names=SPRITES, padding=1):
+        self.assets = assets
+        self.names = names
+        self.padding = padding
+        self.surface = None
+        self.regions = {}
+        self.converted = False
+
+    # Built on first use and once more when a display appears, the converted atlas blits much faster
+    def build(self):
+        converted = pygame.display.get_surface() is not None
+        if self.surface is not None and self.converted == converted:
+            return self.surface
+        images = [self.assets.get(name) for name in self.names]
+        width = sum(image.get_width() + self.padding for image in images)
+        height = max(image.get_height() for image in images)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        x = 0
+        for name, image in zip(self.names, images):
+            self.regions[name] = surface.blit(image, (x, 0))
+            x += image.get_width() + self.padding
+        self.surface = surface.convert_alpha() if converted else surface
+        self.converted = converted
+        return self.surface
+
+    def draw(self, window, name, position):
+        return window.blit(self.surface or self.build(), position, self.regions[name])
+
+    def draw_layer(self, window, name, positions):
+        """Blits the sprite at every position in one call, returns the rects that were drawn on."""
+        surface, region = self.surface or self.build(), self.regions[name]
+        return window.blits([(surface, position, region) for position in positions])
+
+
+ATLAS = SpriteAtlas()
+
+# Fonts are opened once per (face, size) and rendered strings are kept in an LRU cache, so the HUD only
+# renders again when the time or the score changes. Wrapped paragraphs are laid out once into a single surface.
+class TextCache:
+    def __init__(self, max_surfaces=TEXT_CACHE_SIZE):
+        self.max_surfaces = max_surfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.paragraphs = {}
+        self.counters = {name: [0, 0] for name in ("fonts", "surfaces", "paragraphs")}
+
+    def count(self, cache, hit):
+        self.counters[cache][0 if hit else 1] += 1
+
+    def font(self, size, face=None):
+        key = (face, size)
+        font = self.fonts.get(key)
+        self.count("fonts", font is not None)
+        if font is None:
+            init_pygame(display=False)
+            font = self.fonts[key] = pygame.font.Font(face, size)
+        return font
+
+    def render(self, text, size=36, color=TEXT_COLOR, antialias=True, face=None):
+        key = (text, face, size, color, antialias)
+        surface = self.surfaces.get(key)
+        self.count("surfaces", surface is not None)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.surfaces[key] = self.font(size, face).render(text, antialias, color)
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    # Same word wrapping as the original blit_text, but the words end up on one transparent surface
+    def paragraph(self, text, max_width, size=36, color=TEXT_COLOR, face=None):
+        key = (text, max_width, face, size, color)
+        surface = self.paragraphs.get(key)
+        self.count("paragraphs", surface is not None)
+        if surface is not None:
+            return surface
+        font = self.font(size, face)
+        space = font.size(' ')[0]
+        placed = []
+        x = y = width = 0
+        for line in text.splitlines():
+            for word in line.split(' '):
+                word_surface = font.render(word, 0, color)
+                word_width, word_height = word_surface.get_size()
+                if x + word_width >= max_width:
+                    x = 0
+                    y += word_height
+                placed.append((word_surface, (x, y)))
+                width = max(width, x + word_width)
+                x += word_width + space
+            x = 0
+            y += word_height
+        surface = pygame.Surface((max(width, 1), max(y, 1)), pygame.SRCALPHA)
+        surface.blits(placed, doreturn=False)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self.paragraphs[key] = surface
+        return surface
+
+    def stats(self):
+        stats = {}
+        for name, (hits, misses) in self.counters.items():
+            lookups = hits + misses
+            stats[name] = {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+        stats["cached_surfaces"] = len(self.surfaces)
+        return stats
+
+
+TEXT = TextCache()
+
+NEIGHBOURS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+# One breadth-first search from the player's cell gives every cell of the screen the step that leads toward the player,
+# so any number of chasing monsters steer with a single lookup each. The search only runs again when the player moves
+# to another cell. Wherever heading straight for the player's cell is already a shortest step, and in the player's own
+# cell or where there is no path at all, monsters keep steering straight at the player pixel by pixel.
+class FlowField:
+    def __init__(self, cell_size=FLOW_CELL_SIZE, width=WIDTH, height=HEIGHT, obstacles=()):
+        self.cell_size = cell_size
+        self.columns = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        self.blocked = set()
+        self.goal = None
+        self.builds = 0
+        cells = self.columns * self.rows
+        self.steps_x = [0] * cells
+        self.steps_y = [0] * cells
+        self.direct = [True] * cells
+        self.steps = [None] * cells
+        self.arrays = None
+        if np is not None:
+            self.arrays = (np.zeros(cells), np.zeros(cells), np.ones(cells, dtype=bool))
+        for rect in obstacles:
+            self.add_obstacle(rect)
+
+    def cell(self, x, y):
+        column = min(max(int(x // self.cell_size), 0), self.columns - 1)
+        row = min(max(int(y // self.cell_size), 0), self.rows - 1)
+        return column, row
+
+    def index(self, x, y):
+        column, row = self.cell(x, y)
+        return row * self.columns + column
+
+    # Obstacles are (x, y, w, h) boxes in pixels, every cell they touch is blocked
+    def add_obstacle(self, rect):
+        x, y, w, h = rect
+        left, top = self.cell(x, y)
+        right, bottom = self.cell(x + w - 1, y + h - 1)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self.blocked.add((column, row))
+        self.goal = None
+
+    def update(self, target_x, target_y):
+        goal = self.cell(target_x, target_y)
+        if goal != self.goal:
+            self.build(goal)
+
+    def passable(self, column, row):
+        return 0 <= column < self.columns and 0 <= row < self.rows and (column, row) not in self.blocked
+
+    def build(self, goal):
+        self.goal = goal
+        self.builds += 1
+        # Without obstacles the straight step is a shortest one everywhere, every cell stays direct
+        if not self.blocked:
+            return
+        columns, passable = self.columns, self.passable
+        distance = {goal: 0}
+        frontier = [goal]
+        while frontier:
+            next_frontier = []
+            for column, row in frontier:
+                step = distance[(column, row)] + 1
+                for dx, dy in NEIGHBOURS:
+                    neighbour = (column + dx, row + dy)
+                    if neighbour in distance or not passable(*neighbour):
+                        continue
+                    # No cutting corners past an obstacle
+                    if dx and dy and not (passable(column + dx, row) and passable(column, row + dy)):
+                        continue
+                    distance[neighbour] = step
+                    next_frontier.append(neighbour)
+            frontier = next_frontier
+        steps_x, steps_y, direct = self.steps_x, self.steps_y, self.direct
+        goal_column, goal_row = goal
+        for row in range(self.rows):
+            for column in range(columns):
+                index = row * columns + column
+                own = distance.get((column, row))
+                steps_x[index] = steps_y[index] = 0
+                direct[index] = own is None or own == 0
+                if direct[index]:
+                    continue
+                toward_x, toward_y = sign(goal_column - column), sign(goal_row - row)
+                # Open space needs no detour, the field only takes over where the straight line is blocked
+                if self.is_step(distance, column, row, toward_x, toward_y, own):
+                    direct[index] = True
+                    continue
+                # Of the neighbours one step closer, the one closest to pointing at the goal wins
+                best, best_score = None, None
+                for dx, dy in NEIGHBOURS:
+                    if not self.is_step(distance, column, row, dx, dy, own):
+                        continue
+                    score = (dx != toward_x) + (dy != toward_y)
+                    if best is None or score < best_score:
+                        best, best_score = (dx, dy), score
+                steps_x[index], steps_y[index] = best
+        self.steps = [None if direct[i] else (steps_x[i], steps_y[i]) for i in range(len(direct))]
+        if np is not None:
+            self.arrays = (np.array(steps_x, dtype=float), np.array(steps_y, dtype=float), np.array(direct, dtype=bool))
+
+    def is_step(self, distance, column, row, dx, dy, own):
+        """Whether moving by (dx, dy) from the cell gets one cell closer to the goal."""
+        if distance.get((column + dx, row + dy)) != own - 1:
+            return False
+        return not (dx and dy) or (self.passable(column + dx, row) and self.passable(column, row + dy))
+
+    def direction(self, x, y):
+        """The step (-1, 0 or 1 per axis) a chaser at (x, y) should take, None where it should steer straight."""
+        size = self.cell_size
+        column, row = int(x // size), int(y // size)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            column, row = self.cell(x, y)
+        return self.steps[row * self.columns + column]
+
+
+# Continuous collision: an entity is tested along its whole movement of the tick, from (prev_x, prev_y) to (x, y),
+# so fast coins and low tick rates can not tunnel through monsters.
+def swept_bounds(entity):
+    """The box covering the entity's hitbox over the whole tick, as (x, y, w, h)."""
+    box = entity.hitbox
+    left = min(entity.prev_x, entity.x) + box.x
+    top = min(entity.prev_y, entity.y) + box.y
+    return left, top, abs(entity.x - entity.prev_x) + box.w, abs(entity.y - entity.prev_y) + box.h
+
+
+def sweep(a, b):
+    """The earliest fraction of the tick (0 to 1) at which the hitboxes of a and b overlap, None if they never do.
+    Works in b's frame of reference: a moves by the difference of both movements against a still box."""
+    a_box, b_box = a.hitbox, b.hitbox
+    start_x = (a.prev_x + a_box.x) - (b.prev_x + b_box.x)
+    start_y = (a.prev_y + a_box.y) - (b.prev_y + b_box.y)
+    move_x = (a.x - a.prev_x) - (b.x - b.prev_x)
+    move_y = (a.y - a.prev_y) - (b.y - b.prev_y)
+    # Overlap means -a_width < offset < b_width on both axes (slab test of a segment against a box)
+    enter, leave = 0.0, 1.0
+    if move_x == 0:
+        if not -a_box.w < start_x < b_box.w:
+            return None
+    else:
+        t0 = (-a_box.w - start_x) / move_x
+        t1 = (b_box.w - start_x) / move_x
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > enter:
+            enter = t0
+        if t1 < leave:
+            leave = t1
+        if enter >= leave:
+            return None
+    if move_y == 0:
+        if not -a_box.h < start_y < b_box.h:
+            return None
+    else:
+        t0 = (-a_box.h - start_y) / move_y
+        t1 = (b_box.h - start_y) / move_y
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > enter:
+            enter = t0
+        if t1 < leave:
+            leave = t1
+        if enter >= leave:
+            return None
+    return enter
+
+
+def overlaps(a, b):
+    a_box, b_box = a.hitbox, b.hitbox
+    ax, ay = a.x + a_box.x, a.y + a_box.y
+    bx, by = b.x + b_box.x, b.y + b_box.y
+    return ax < bx + b_box.w and bx < ax + a_box.w and ay < by + b_box.h and by < ay + a_box.h
+
+
+# Live entities of one type plus a free list of dead ones. acquire() reuses a dead entity through its reset()
+# instead of allocating, release() only marks the entity dead (O(1), safe while iterating) and compact() drops
+# the dead ones in one pass at the end of the tick, keeping the order of the survivors, and frees them for reuse.
+class EntityPool:
+    def __init__(self, factory):
+        self.factory = factory
+        self.active = []
+        self.free = []
+        self.dead = 0
+        self.version = 0  # Changes whenever entities join or leave the active list
+        self.allocated = 0
+        self.reused = 0
+        self.released = 0
+
+    def __len__(self):
+        return len(self.active) - self.dead
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __getitem__(self, index):
+        return self.active[index]
+
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args)
+            self.reused += 1
+        else:
+            entity = self.factory(*args)
+            self.allocated += 1
+        entity.alive = True
+        self.active.append(entity)
+        self.version += 1
+        return entity
+
+    # Takes in an entity that was created outside the pool
+    def append(self, entity):
+        entity.alive = True
+        self.active.append(entity)
+        self.version += 1
+
+    def release(self, entity):
+        if entity.alive:
+            entity.alive = False
+            self.dead += 1
+            self.released += 1
+
+    def compact(self):
+        if self.dead:
+            active = []
+            for entity in self.active:
+                (active if entity.alive else self.free).append(entity)
+            self.active = active
+            self.dead = 0
+            self.version += 1
+
+    def clear(self):
+        for entity in self.active:
+            self.release(entity)
+        self.compact()
+
+    def resize(self, count, *args):
+        """Keeps the first count live entities and acquires more with args if there are fewer, for callers
+        that overwrite every entity's state right after, like Game.restore."""
+        self.compact()
+        for entity in self.active[count:]:
+            self.release(entity)
+        self.compact()
+        while len(self.active) < count:
+            self.acquire(*args)
+        return self.active
+
+    def stats(self):
+        return {
+            "active": len(self),
+            "free": len(self.free),
+            "allocated": self.allocated,
+            "reused": self.reused,
+            "released": self.released,
+            "allocations_avoided": self.reused,
+        }
+
+
+# Uniform grid so coins only test the monsters in the cells around them instead of all of them
+class SpatialGrid:
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cell_range(self, x, y, w, h):
+        size = self.cell_size
+        return (int(x // size), int(y // size), int((x + w) // size), int((y + h) // size))
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.counter = 0
+
+    def insert(self, entity, x, y, w=0, h=0):
+        if entity in self.entries:
+            self.remove(entity)
+        left, top, right, bottom = self.cell_range(x, y, w, h)
+        keys = [(cx, cy) for cx in range(left, right + 1) for cy in range(top, bottom + 1)]
+        for key in keys:
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [entity]
+            else:
+                cell.append(entity)
+        # The insertion order is kept so queries answer in the same order as a scan of the list would
+        self.entries[entity] = (self.counter, keys)
+        self.counter += 1
+
+    def remove(self, entity):
+        _, keys = self.entries.pop(entity)
+        for key in keys:
+            cell = self.cells[key]
+            cell.remove(entity)
+            if not cell:
+                del self.cells[key]
+
+    def rebuild(self, entities, bounds=None):
+        self.clear()
+        if bounds is None:
+            for entity in entities:
+                self.insert(entity, entity.x, entity.y)
+        else:
+            for entity in entities:
+                self.insert(entity, *bounds(entity))
+
+    def query(self, x, y, w=0, h=0):
+        left, top, right, bottom = self.cell_range(x, y, w, h)
+        cells = self.cells
+        if left == right and top == bottom:
+            return list(cells.get((left, top), ()))
+        found = set()
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        entries = self.entries
+        return sorted(found, key=lambda entity: entries[entity][0])
+
+    def query_near(self, x, y, radius=HITBOX_SIZE):
+        return self.query(x - radius, y - radius, 2 * radius, 2 * radius)
+
+# Optional structure-of-arrays backend: positions, velocities and behaviors live in numpy arrays and
+# every monster and coin is advanced with a handful of vectorized operations per tick.
+# The arithmetic mirrors Monster.update and Coin.update step by step so both paths give identical trajectories.
+# The arrays stay the source of truth between ticks and are only loaded again from the objects when a pool gains
+# or loses entities, each tick just copies the new positions back for collisions and drawing.
+class EntityArrays:
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("The numpy entity backend needs numpy, install it with: pip install numpy")
+        self.versions = None
+        self.load([], [])
+
+    # Call after changing positions or velocities of pooled entities directly, the next tick loads them again
+    def invalidate(self):
+        self.versions = None
+
+    def sync(self, monsters, coins):
+        versions = (id(monsters), monsters.version, id(coins), coins.version)
+        if versions != self.versions:
+            self.load(monsters, coins)
+            self.versions = versions
+
+    def load(self, monsters, coins):
+        self.monster_x = np.array([monster.x for monster in monsters], dtype=float)
+        self.monster_y = np.array([monster.y for monster in monsters], dtype=float)
+        self.monster_dx = np.array([monster.dx for monster in monsters], dtype=float)
+        self.monster_dy = np.array([monster.dy for monster in monsters], dtype=float)
+        self.monster_speed = np.array([monster.speed for monster in monsters], dtype=float)
+        self.monster_chase = np.array([monster.behavior == "chase" for monster in monsters], dtype=bool)
+        self.coin_x = np.array([coin.x for coin in coins], dtype=float)
+        self.coin_y = np.array([coin.y for coin in coins], dtype=float)
+        self.coin_speed_x = np.array([coin.speed_x for coin in coins], dtype=float)
+        self.coin_speed_y = np.array([coin.speed_y for coin in coins], dtype=float)
+        self.coin_max_x = np.array([WIDTH - coin.image.get_width() for coin in coins], dtype=float)
+        self.coin_max_y = np.array([HEIGHT - coin.image.get_height() for coin in coins], dtype=float)
+
+    def step(self, player_x, player_y, scale=1.0, field=None):
+        x, y, dx, dy = self.monster_x, self.monster_y, self.monster_dx, self.monster_dy
+        wander = ~self.monster_chase
+        # Random walkers bounce off the walls before moving, chasers follow the flow field or step straight at the player
+        np.negative(dx, out=dx, where=wander & ((x <= 0) | (x >= WIDTH - 40)))
+        np.negative(dy, out=dy, where=wander & ((y <= 0) | (y >= HEIGHT - 40)))
+        chase_x, chase_y = np.sign(player_x - x), np.sign(player_y - y)
+        if field is not None:
+            field_x, field_y, direct = field.arrays
+            size = field.cell_size
+            index = (np.clip(y // size, 0, field.rows - 1) * field.columns + np.clip(x // size, 0, field.columns - 1)).astype(int)
+            chase_x = np.where(direct[index], chase_x, field_x[index])
+            chase_y = np.where(direct[index], chase_y, field_y[index])
+        x += np.where(self.monster_chase, chase_x * (self.monster_speed * scale), dx * scale)
+        y += np.where(self.monster_chase, chase_y * (self.monster_speed * scale), dy * scale)
+
+        cx, cy, vx, vy = self.coin_x, self.coin_y, self.coin_speed_x, self.coin_speed_y
+        cx += vx * scale
+        cy += vy * scale
+        np.negative(vx, out=vx, where=(cx <= 0) | (cx >= self.coin_max_x))
+        np.negative(vy, out=vy, where=(cy <= 0) | (cy >= self.coin_max_y))
+
+    # The previous positions come along too, the game needs them for swept collisions and interpolation
+    def store(self, monsters, coins):
+        for monster, x, y, dx, dy in zip(monsters, self.monster_x.tolist(), self.monster_y.tolist(),
+                                         self.monster_dx.tolist(), self.monster_dy.tolist()):
+            monster.prev_x, monster.prev_y = monster.x, monster.y
+            monster.x, monster.y, monster.dx, monster.dy = x, y, dx, dy
+        for coin, x, y, speed_x, speed_y in zip(coins, self.coin_x.tolist(), self.coin_y.tolist(),
+                                                self.coin_speed_x.tolist(), self.coin_speed_y.tolist()):
+            coin.prev_x, coin.prev_y = coin.x, coin.y
+            coin.x, coin.y, coin.speed_x, coin.speed_y = x, y, speed_x, speed_y
+
+    def advance(self, monsters, coins, player_x, player_y, scale=1.0, field=None, ticks=1):
+        self.sync(monsters, coins)
+        for _ in range(ticks):
+            self.step(player_x, player_y, scale, field)
+        self.store(monsters, coins)
+
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha
+
+
+# Unit vectors for every aim step, shared by the arrow, the coin spawn offset and the coin velocity
+AIM_STEPS = 360 * AIM_STEPS_PER_DEGREE
+AIM_DIRECTIONS = [(math.cos(math.radians(step / AIM_STEPS_PER_DEGREE)), math.sin(math.radians(step / AIM_STEPS_PER_DEGREE)))
+                  for step in range(AIM_STEPS)]
+
+
+def aim_direction(angle):
+    """The (cos, sin) of an angle in degrees, rounded to the nearest aim step."""
+    return AIM_DIRECTIONS[round(angle * AIM_STEPS_PER_DEGREE) % AIM_STEPS]
+
+
+def interpolated(entities, alpha):
+    """Where the entities are drawn, alpha of the way from their previous to their current position."""
+    return [(entity.prev_x + (entity.x - entity.prev_x) * alpha, entity.prev_y + (entity.y - entity.prev_y) * alpha)
+            for entity in entities]
+
+
+# Game time: it only moves when a simulation tick runs, so the results never depend on how fast frames are drawn
+# and a headless game runs as fast as the CPU allows
+class SimulatedClock:
+    def __init__(self, tick_rate=TICK_RATE):
+        self.tick_rate = tick_rate
+        self.tick_ms = 1000 / tick_rate
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+        return self.tick_ms
+
+    def get_ticks(self):
+        return self.ticks * 1000 // self.tick_rate
+
+
+# Repeating game-time timers, these replace pygame.time.set_timer so spawns follow the game clock
+class Scheduler:
+    def __init__(self):
+        self.timers = []
+
+    def every(self, interval, callback):
+        self.timers.append([interval, interval, callback])
+
+    def reset(self, now):
+        for timer in self.timers:
+            timer[1] = now + timer[0]
+
+    def run_due(self, now):
+        for timer in self.timers:
+            while timer[1] <= now:
+                timer[1] += timer[0]
+                timer[2]()
+
+
+class KeyboardInput:
+    def events(self):
+        return pygame.event.get()
+
+    def pressed(self):
+        return pygame.key.get_pressed()
+
+
+class KeyState:
+    def __init__(self, held):
+        self.held = held
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+# Input for headless games: held keys and queued events are set by a script, a bot or a replay
+class ScriptedInput:
+    def __init__(self):
+        self.held = set()
+        self.queue = []
+
+    def hold(self, *keys):
+        self.held.update(keys)
+
+    def release(self, *keys):
+        self.held.difference_update(keys)
+
+    def press(self, key):
+        self.queue.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+    def click(self, pos):
+        self.queue.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+
+    def quit(self):
+        self.queue.append(pygame.event.Event(pygame.QUIT))
+
+    def events(self):
+        events, self.queue = self.queue, []
+        return events
+
+    def pressed(self):
+        return KeyState(self.held)
+
+# Only the areas that changed are cleared and sent to the display: last frame's boxes are painted over
+# with the background, everything is drawn again and the union of old and new boxes is presented
+class DirtyRectRenderer:
+    def __init__(self, window, background=BACKGROUND_COLOR):
+        self.window = window
+        self.background = background
+        self.screen = window.get_rect()
+        self.previous = []
+        self.current = []
+        self.full_redraw = True
+        self.pending = False
+        self.pixels_pushed = 0
+        self.total_pixels_pushed = 0
+        self.frames = 0
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def begin(self):
+        if self.full_redraw:
+            self.window.fill(self.background)
+        else:
+            for rect in self.previous:
+                self.window.fill(self.background, rect)
+        self.current = []
+        self.pending = True
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def extend(self, rects):
+        self.current.extend(rects)
+
+    # Frames where begin() was not called have nothing new to show and present nothing
+    def present(self):
+        if not self.pending:
+            self.skip()
+            return
+        self.pending = False
+        if self.full_redraw:
+            pygame.display.flip()
+            self.pixels_pushed = self.screen.width * self.screen.height
+            self.full_redraw = False
+        else:
+            rects = [rect.clip(self.screen) for rect in self.previous + self.current]
+            pygame.display.update(rects)
+            self.pixels_pushed = sum(rect.width * rect.height for rect in rects)
+        self.previous = self.current
+        self.finish_frame()
+
+    def skip(self):
+        self.pixels_pushed = 0
+        self.finish_frame()
+
+    def finish_frame(self):
+        self.total_pixels_pushed += self.pixels_pushed
+        self.frames += 1
+
+RECORDED_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_a, pygame.K_d)
+
+
+def keys_to_mask(keys):
+    mask = 0
+    for bit, key in enumerate(RECORDED_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_keys(mask):
+    return {key for bit, key in enumerate(RECORDED_KEYS) if mask >> bit & 1}
+
+
+# Records one session: its seed, the tick it started on, the held keys of every tick (run-length encoded) and the ticks
+# SPACE was pressed on. With the fixed timestep that is all it takes to play the session again. The start tick matters
+# because game time is in whole milliseconds, a session started after some menu ticks rounds differently than one
+# started at tick 0.
+class InputRecorder:
+    def __init__(self):
+        self.recording = None
+
+    def start(self, seed, tick_rate, start_tick):
+        self.start_tick = start_tick
+        self.recording = {"version": 2, "seed": seed, "tick_rate": tick_rate, "start_tick": start_tick, "keys": [],
+                          "shots": [], "ticks": 0, "score": None, "survival_ms": None}
+
+    def record_keys(self, tick, keys):
+        runs = self.recording["keys"]
+        mask = keys_to_mask(keys)
+        if runs and runs[-1][0] == mask:
+            runs[-1][1] += 1
+        else:
+            runs.append([mask, 1])
+        self.recording["ticks"] = tick - self.start_tick + 1
+
+    def record_shot(self, tick):
+        self.recording["shots"].append(tick - self.start_tick)
+
+    def finish(self, score, survival_ms):
+        self.recording["score"] = score
+        self.recording["survival_ms"] = survival_ms
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.recording, file, separators=(",", ":"))
+
+
+def load_recording(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def replay(recording, entity_backend="objects"):
+    """Plays a recorded session headlessly at full speed, returns the finished game."""
+    game = Game(entity_backend=entity_backend, headless=True, tick_rate=recording["tick_rate"])
+    game.sim_clock.ticks = recording.get("start_tick", 0)
+    game.reset_game(recording["seed"])
+    shots = {}
+    for tick in recording["shots"]:
+        shots[tick] = shots.get(tick, 0) + 1
+    tick = 0
+    for mask, count in recording["keys"]:
+        held = mask_to_keys(mask)
+        for _ in range(count):
+            game.input.held = held
+            for _ in range(shots.get(tick, 0)):
+                game.input.press(pygame.K_SPACE)
+            game.handle_events()
+            game.step()
+            tick += 1
+    return game
+
+
+def verify_replay(recording, entity_backend="objects"):
+    """Returns whether the replay ends with the recorded score and survival time, and what it ended with."""
+    game = replay(recording, entity_backend)
+    result = {"score": game.score, "survival_ms": game.survival_time()}
+    expected = {"score": recording["score"], "survival_ms": recording["survival_ms"]}
+    return result == expected, result
+
+class ProfileScope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+NULL_SCOPE = contextlib.nullcontext()
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile, fraction 0.95 gives the p95 of the samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+# Named timing scopes with the last PROFILE_HISTORY samples of each one kept in a ring buffer.
+# A disabled profiler hands out one shared do-nothing context manager, so the hooks cost close to nothing.
+class Profiler:
+    def __init__(self, enabled=False, history=PROFILE_HISTORY):
+        self.enabled = enabled
+        self.enabled_before_overlay = enabled
+        self.history = history
+        self.scopes = {}
+        self.rings = {}
+        self.overlay = False
+        self.overlay_surface = None
+        self.overlay_age = 0
+
+    def scope(self, name):
+        if not self.enabled:
+            return NULL_SCOPE
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = ProfileScope(self, name)
+        return scope
+
+    def record(self, name, seconds):
+        ring = self.rings.get(name)
+        if ring is None:
+            ring = self.rings[name] = [[0.0] * self.history, 0, 0]
+        samples, index, count = ring
+        samples[index] = seconds
+        ring[1] = (index + 1) % self.history
+        ring[2] = min(count + 1, self.history)
+
+    def samples(self, name):
+        """The recorded samples of a scope, oldest first."""
+        samples, index, count = self.rings[name]
+        if count < self.history:
+            return samples[:count]
+        return samples[index:] + samples[:index]
+
+    def summary(self):
+        summary = {}
+        for name in sorted(self.rings):
+            samples = self.samples(name)
+            summary[name] = {
+                "samples": len(samples),
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "max_ms": max(samples) * 1000,
+            }
+        return summary
+
+    # The overlay needs timings while it is open, closing it puts profiling back the way it was
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled_before_overlay = self.enabled
+            self.enabled = True
+        else:
+            self.enabled = self.enabled_before_overlay
+
+    # The panel is rebuilt every few frames, rendering its text every frame would cost more than what it measures
+    def draw_overlay(self, window, counts):
+        self.overlay_age -= 1
+        if self.overlay_surface is None or self.overlay_age <= 0:
+            self.overlay_surface = self.build_overlay(counts)
+            self.overlay_age = 15
+        return window.blit(self.overlay_surface, (10, 10))
+
+    def build_overlay(self, counts):
+        panel = pygame.Surface((260, 90 + 18 * len(self.rings)), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        if "frame" in self.rings:
+            frames = self.samples("frame")
+            points = [(10 + i * 240 / self.history, 70 - min(ms * 1000, 50)) for i, ms in enumerate(frames)]
+            pygame.draw.line(panel, (90, 90, 90), (10, 70 - 1000 / FPS), (250, 70 - 1000 / FPS))
+            if len(points) > 1:
+                pygame.draw.lines(panel, (0, 255, 0), False, points)
+        lines = [", ".join("%s %d" % item for item in counts.items())]
+        lines += ["%-18s %6.2f ms" % (name, stats["mean_ms"]) for name, stats in self.summary().items()]
+        for row, line in enumerate(lines):
+            panel.blit(TEXT.render(line, 18), (10, 75 + 18 * row))
+        return panel
+
+    def export(self, path):
+        with open(path, "w") as file:
+            json.dump({"summary": self.summary(), "samples": {name: self.samples(name) for name in self.rings}}, file)
+
+# Snapshots: a fixed header followed by the timers and the entities as packed arrays of doubles, the two random
+# generators are stored as their raw Mersenne Twister words. All little endian, no pickling.
+SNAPSHOT_MAGIC = b"RSNP"
+SNAPSHOT_VERSION = 1
+# magic, version, state, clock ticks, start, end, score, monster limit, session seed (-1 for none),
+# player x, y, prev x, prev y, aim, coins in hand, then the number of timers, doors, monsters and coins
+SNAPSHOT_HEADER = struct.Struct("<4sHBqqqiiqddddiiIIII")
+RANDOM_STATE = struct.Struct("<I?d")  # Twister position, whether a gauss value is pending and that value
+DOOR_FIELDS = 3  # x, y, remaining lifetime
+MONSTER_FIELDS = 8  # x, y, prev x, prev y, dx, dy, speed, chases
+COIN_FIELDS = 8  # x, y, prev x, prev y, speed x, speed y, angle, collectable
+
+
+def pack_random(generator):
+    version, internal, gauss = generator.getstate()
+    return array("I", internal[:-1]).tobytes() + RANDOM_STATE.pack(internal[-1], gauss is not None, gauss or 0.0)
+
+
+def unpack_random(generator, data, offset):
+    words = array("I")
+    words.frombytes(data[offset:offset + 624 * 4])
+    offset += 624 * 4
+    position, has_gauss, gauss = RANDOM_STATE.unpack_from(data, offset)
+    generator.setstate((3, tuple(words) + (position,), gauss if has_gauss else None))
+    return offset + RANDOM_STATE.size
+
+
+def unpack_doubles(data, offset, count):
+    values = array("d")
+    values.frombytes(data[offset:offset + count * 8])
+    return values.tolist(), offset + count * 8
+
 
 # Game states
 START_SCREEN_PART1 = 0
@@ -43,198 +1044,366 @@ GAME_OVER = 3
 
 # Initialize game window
 class Game:
-    def __init__(self):
-        self.window = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Robot Survival")
-        self.clock = pygame.time.Clock()
+    def __init__(self, entity_backend="objects", headless=False, input_source=None, tick_rate=TICK_RATE, max_fps=FPS,
+                 seed=None, record=False, profile=False, profile_path=None, collision_mode=COLLISION_MODE,
+                 obstacles=()):
+        self.headless = headless
+        self.flow_field = FlowField(obstacles=obstacles)
+        self.collision_mode = collision_mode
+        self.profiler = Profiler(enabled=profile or profile_path is not None)
+        self.profile_path = profile_path
+        # Every session gets its own seed from this generator, so a recording only needs to store that seed
+        self.seeds = random.Random(seed)
+        self.session_seed = None
+        self.rng = random.Random()
+        self.recorder = InputRecorder() if record else None
+        if headless:
+            # Nothing is drawn and there is no frame cap
+            self.window = None
+            self.clock = None
+            self.input = input_source or ScriptedInput()
+        else:
+            init_pygame()
+            self.window = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption("Robot Survival")
+            self.clock = pygame.time.Clock()
+            self.input = input_source or KeyboardInput()
+        self.renderer = DirtyRectRenderer(self.window) if self.window is not None else None
+        self.drawn_state = None
+        self.max_fps = max_fps
+        self.sim_clock = SimulatedClock(tick_rate)
+        self.get_ticks = self.sim_clock.get_ticks
+        self.step_scale = MOVEMENT_RATE / tick_rate
+        ASSETS.preload()
+        ATLAS.build()
         self.running = True
         self.state = START_SCREEN_PART1
         self.player = Player(WIDTH // 2, HEIGHT // 2)
-        self.monsters = []
-        self.doors = []
-        self.coins = []
+        self.monsters = EntityPool(Monster)
+        self.doors = EntityPool(Door)
+        self.coins = EntityPool(Coin)
+        self.monster_grid = SpatialGrid()
+        self.entity_arrays = EntityArrays() if entity_backend == "numpy" else None
         self.monster_limit = INITIAL_MONSTER_LIMIT
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.get_ticks()
         self.score = 0
-        pygame.time.set_timer(pygame.USEREVENT, MONSTER_SPAWN_INTERVAL)
-        pygame.time.set_timer(pygame.USEREVENT + 1, COIN_SPAWN_INTERVAL)
+        self.timers = Scheduler()
+        self.timers.every(MONSTER_SPAWN_INTERVAL, self.spawn_door)
+        self.timers.every(COIN_SPAWN_INTERVAL, self.spawn_coin)
+        if headless:
+            self.start_game()
     
+    # Fixed timestep: real time is collected in an accumulator and spent in whole simulation ticks,
+    # the leftover fraction of a tick is used to interpolate what gets drawn
     def run(self):
+        accumulator = 0.0
+        tick_ms = self.sim_clock.tick_ms
+        profiler = self.profiler
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
+            accumulator += min(self.clock.tick(self.max_fps), MAX_FRAME_MS)
+            with profiler.scope("frame"):
+                with profiler.scope("events"):
+                    self.handle_events()
+                while accumulator >= tick_ms:
+                    self.step()
+                    accumulator -= tick_ms
+                self.draw(accumulator / tick_ms)
+        if self.profile_path:
+            profiler.export(self.profile_path)
         pygame.quit()
+
+    def step(self):
+        self.update()
+        self.sim_clock.tick()
+
+    def run_headless(self, max_frames=None):
+        """Simulates ticks without drawing or waiting until the game ends, returns the run statistics."""
+        start = time.perf_counter()
+        frames = 0
+        while self.running and self.state == GAME_RUNNING and (max_frames is None or frames < max_frames):
+            self.handle_events()
+            self.step()
+            frames += 1
+        wall_time = time.perf_counter() - start
+        return {
+            "frames": frames,
+            "simulated_ms": frames * self.sim_clock.tick_ms,
+            "wall_seconds": wall_time,
+            "simulated_fps": frames / wall_time if wall_time > 0 else float("inf"),
+            "survival_ms": self.survival_time(),
+            "score": self.score,
+            "game_over": self.state == GAME_OVER,
+        }
     
     def handle_events(self):
-        for event in pygame.event.get():
+        for event in self.input.events():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.WINDOWEXPOSED and self.renderer is not None:
+                self.renderer.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_OVERLAY_KEY:
+                self.profiler.toggle_overlay()
             elif self.state == GAME_RUNNING:
-                if event.type == pygame.USEREVENT:
-                    self.spawn_door()
-                elif event.type == pygame.USEREVENT + 1:
-                    self.spawn_coin()
-                elif event.type == pygame.KEYDOWN:
+                if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
+                        if self.recorder is not None:
+                            self.recorder.record_shot(self.sim_clock.ticks)
                         self.shoot_coin()
             elif self.state == START_SCREEN_PART1 or self.state == START_SCREEN_PART2:
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_start_screen_click()
+                    self.handle_start_screen_click(event.pos)
             elif self.state == GAME_OVER:
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_game_over_click()
+                    self.handle_game_over_click(event.pos)
     
     def update(self):
         if self.state == GAME_RUNNING:
-            self.player.update()
-            for door in self.doors[:]:
-                door.update()
-                if door.timer_expired():
-                    self.spawn_monster(door.x, door.y)
-                    self.doors.remove(door)
-            for monster in self.monsters[:]:
-                monster.update(self.player.x, self.player.y)
-                if self.check_collision(monster, self.player):
-                    self.game_over()
-            for coin in self.coins[:]:
-                coin.update()
-                if coin.check_collision(self.monsters):
-                    self.monsters.remove(coin.target)
-                    self.coins.remove(coin)
-                    self.score += 1
-                if coin.check_collision_with_player(self.player):
-                    self.player.coins += 1
-                    self.coins.remove(coin)
-            elapsed_time = (pygame.time.get_ticks() - self.start_time) // 1000
-            self.monster_limit = INITIAL_MONSTER_LIMIT + (elapsed_time // 30)
+            with self.profiler.scope("update"):
+                self.update_movement()
+            with self.profiler.scope("collision"):
+                self.resolve_collisions()
+
+    # One tick is split in two phases, moving everything and then resolving what touches, so they can be timed apart
+    def update_movement(self):
+        now = self.get_ticks()
+        self.timers.run_due(now)
+        keys = self.input.pressed()
+        if self.recorder is not None:
+            self.recorder.record_keys(self.sim_clock.ticks, keys)
+        self.player.update(keys, self.step_scale)
+        for door in self.doors:
+            door.update()
+            if door.timer_expired(now):
+                self.spawn_monster(door.x, door.y)
+                self.doors.release(door)
+        self.doors.compact()
+        self.update_entities()
+        elapsed_time = (now - self.start_time) // 1000
+        self.monster_limit = INITIAL_MONSTER_LIMIT + (elapsed_time // 30)
+
+    def resolve_collisions(self):
+        if self.collision_mode == "swept":
+            self.resolve_swept_collisions()
+            return
+        self.monster_grid.rebuild(self.monsters)
+        for monster in self.monster_grid.query_near(self.player.x, self.player.y):
+            if self.check_collision(monster, self.player):
+                self.game_over()
+                break
+        for coin in self.coins:
+            if coin.check_collision(self.monster_grid.query_near(coin.x, coin.y)):
+                self.monster_grid.remove(coin.target)
+                self.monsters.release(coin.target)
+                self.coins.release(coin)
+                self.score += 1
+                continue
+            if coin.check_collision_with_player(self.player):
+                self.player.coins += 1
+                self.coins.release(coin)
+        self.monsters.compact()
+        self.coins.compact()
+
+    def resolve_swept_collisions(self):
+        player = self.player
+        grid = self.monster_grid
+        # A handful of monsters is checked directly, filling the grid costs more than it saves
+        use_grid = len(self.monsters) > LINEAR_COLLISION_LIMIT
+        grid.clear()
+        reach = {}
+        for monster in self.monsters:
+            reach[monster] = box = swept_bounds(monster)
+            if use_grid:
+                grid.insert(monster, *box)
+        for monster in grid.query(*swept_bounds(player)) if use_grid else reach:
+            if sweep(monster, player) is not None:
+                self.game_over()
+                break
+        for coin in self.coins:
+            # A coin hits the monster it reaches first during the tick, monsters whose swept boxes it does
+            # not even touch are skipped before the exact test
+            target, first = None, 2.0
+            x, y, w, h = swept_bounds(coin)
+            for monster in grid.query(x, y, w, h) if use_grid else reach:
+                mx, my, mw, mh = reach[monster]
+                if x >= mx + mw or mx >= x + w or y >= my + mh or my >= y + h or not monster.alive:
+                    continue
+                hit = sweep(coin, monster)
+                if hit is not None and hit < first:
+                    target, first = monster, hit
+            if target is not None:
+                if use_grid:
+                    grid.remove(target)
+                self.monsters.release(target)
+                self.coins.release(coin)
+                self.score += 1
+                continue
+            # A coin that was just shot starts inside the robot, it can only be picked up once it has left
+            if not coin.collectable:
+                coin.collectable = not overlaps(coin, player)
+            elif sweep(coin, player) is not None:
+                player.coins += 1
+                self.coins.release(coin)
+        self.monsters.compact()
+        self.coins.compact()
     
-    def draw(self):
-        self.window.fill(BACKGROUND_COLOR)
-        if self.state == START_SCREEN_PART1:
-            self.draw_start_screen_part1()
-        elif self.state == START_SCREEN_PART2:
-            self.draw_start_screen_part2()
-        elif self.state == GAME_RUNNING:
-            self.player.draw(self.window)
-            for door in self.doors:
-                door.draw(self.window)
+    def update_entities(self):
+        profiler = self.profiler
+        field = self.flow_field
+        with profiler.scope("update.flow_field"):
+            field.update(self.player.x, self.player.y)
+        if self.entity_arrays is not None:
+            with profiler.scope("update.arrays"):
+                self.entity_arrays.advance(self.monsters, self.coins, self.player.x, self.player.y, self.step_scale, field)
+            return
+        for monster in self.monsters:
+            monster.prev_x, monster.prev_y = monster.x, monster.y
+        for coin in self.coins:
+            coin.prev_x, coin.prev_y = coin.x, coin.y
+        with profiler.scope("update.monsters"):
             for monster in self.monsters:
-                monster.draw(self.window)
+                monster.update(self.player.x, self.player.y, self.step_scale, field)
+        with profiler.scope("update.coins"):
             for coin in self.coins:
-                coin.draw(self.window)
-            self.draw_timer_and_score()
-        elif self.state == GAME_OVER:
-            self.draw_game_over_screen()
-        pygame.display.flip()
+                coin.update(self.step_scale)
+
+    def draw(self, alpha=1.0):
+        with self.profiler.scope("draw"):
+            self.render(alpha)
+        with self.profiler.scope("present"):
+            self.renderer.present()
+
+    # Draws into the window without presenting it, alpha is how far the render time is between the previous and the current tick
+    def render(self, alpha=1.0):
+        renderer = self.renderer
+        if self.state != self.drawn_state:
+            renderer.invalidate()
+            self.drawn_state = self.state
+        if self.state == GAME_RUNNING:
+            renderer.begin()
+            window = self.window
+            add = renderer.add
+            profiler = self.profiler
+            add(self.player.draw(window, alpha))
+            # One batched blit per layer, doors below monsters below coins
+            with profiler.scope("draw.doors"):
+                renderer.extend(ATLAS.draw_layer(window, "door.png", [(door.x, door.y) for door in self.doors]))
+            with profiler.scope("draw.monsters"):
+                renderer.extend(ATLAS.draw_layer(window, "monster.png", interpolated(self.monsters, alpha)))
+            with profiler.scope("draw.coins"):
+                renderer.extend(ATLAS.draw_layer(window, "coin.png", interpolated(self.coins, alpha)))
+            with profiler.scope("draw.text"):
+                for rect in self.draw_timer_and_score():
+                    add(rect)
+            if profiler.overlay:
+                counts = {"doors": len(self.doors), "monsters": len(self.monsters), "coins": len(self.coins)}
+                add(profiler.draw_overlay(window, counts))
+        elif renderer.full_redraw:
+            # Menus never change on their own, they are drawn once and then left on screen
+            renderer.begin()
+            if self.state == START_SCREEN_PART1:
+                self.draw_start_screen_part1()
+            elif self.state == START_SCREEN_PART2:
+                self.draw_start_screen_part2()
+            elif self.state == GAME_OVER:
+                self.draw_game_over_screen()
 
     # So silly, took me a while of messing with "f" before checking...: https://stackoverflow.com/questions/42014195/rendering-text-with-multiple-lines-in-pygame
-    def blit_text(self, surface, text, pos, font=FONT, color=(255, 255, 255)):
-        words = [word.split(' ') for word in text.splitlines()]  # 2D array where each row is a list of words.
-        space = font.size(' ')[0]  # The width of a space.
-        max_width, max_height = WIDTH, HEIGHT
-        x, y = pos
-        for line in words:
-            for word in line:
-                word_surface = font.render(word, 0, color)
-                word_width, word_height = word_surface.get_size()
-                if x + word_width >= max_width:
-                    x = pos[0]  # Reset the x.
-                    y += word_height  # Start on new row.
-                surface.blit(word_surface, (x, y))
-                x += word_width + space
-            x = pos[0]  # Reset the x.
-            y += word_height  # Start on new row.
+    # The wrapping itself now lives in TextCache.paragraph and only runs the first time a text is shown
+    def blit_text(self, surface, text, pos, size=36, color=TEXT_COLOR):
+        return surface.blit(TEXT.paragraph(text, WIDTH - pos[0], size, color), pos)
     
     def spawn_door(self):
         if len(self.monsters) + len(self.doors) < self.monster_limit:
             x, y = self.get_random_border_position()
-            self.doors.append(Door(x, y))
+            self.doors.acquire(x, y, self.get_ticks())
     
     def spawn_monster(self, x, y):
-        behavior = random.choice(["random", "chase"])
-        self.monsters.append(Monster(x, y, behavior))
+        behavior = self.rng.choice(["random", "chase"])
+        self.monsters.acquire(x, y, behavior, self.rng)
     
     def shoot_coin(self):
         if self.player.coins > 0:
             angle = self.player.arrow_angle
-            spawn_x = self.player.x + self.player.robot_width // 2 + COIN_SPAWN_OFFSET * math.cos(math.radians(angle))
-            spawn_y = self.player.y + self.player.robot_height // 2 + COIN_SPAWN_OFFSET * math.sin(math.radians(angle))
-            self.coins.append(Coin(spawn_x, spawn_y, angle))
+            cos, sin = aim_direction(angle)
+            spawn_x = self.player.x + self.player.robot_width // 2 + COIN_SPAWN_OFFSET * cos
+            spawn_y = self.player.y + self.player.robot_height // 2 + COIN_SPAWN_OFFSET * sin
+            self.coins.acquire(spawn_x, spawn_y, angle, False)
             self.player.coins -= 1
     
     def spawn_coin(self):
-        x, y = random.randint(0, WIDTH), random.randint(0, HEIGHT)
-        self.coins.append(Coin(x, y, 0))
+        x, y = self.rng.randint(0, WIDTH), self.rng.randint(0, HEIGHT)
+        self.coins.acquire(x, y, 0)
     
     def get_random_border_position(self):
-        side = random.choice(["top", "bottom", "left", "right"])
+        side = self.rng.choice(["top", "bottom", "left", "right"])
         if side == "top":
-            return random.randint(0, WIDTH), 0
+            return self.rng.randint(0, WIDTH), 0
         elif side == "bottom":
-            return random.randint(0, WIDTH), HEIGHT - 40
+            return self.rng.randint(0, WIDTH), HEIGHT - 40
         elif side == "left":
-            return 0, random.randint(0, HEIGHT)
+            return 0, self.rng.randint(0, HEIGHT)
         else:
-            return WIDTH - 40, random.randint(0, HEIGHT)
+            return WIDTH - 40, self.rng.randint(0, HEIGHT)
     
     def check_collision(self, monster, player):
-        return abs(monster.x - player.x) < 20 and abs(monster.y - player.y) < 20
+        return abs(monster.x - player.x) < HITBOX_SIZE and abs(monster.y - player.y) < HITBOX_SIZE
     
     def game_over(self):
         self.state = GAME_OVER
-        self.end_time = pygame.time.get_ticks()
+        self.end_time = self.get_ticks()
+        if self.recorder is not None:
+            self.recorder.finish(self.score, self.survival_time())
+
+    def pool_stats(self):
+        return {"doors": self.doors.stats(), "monsters": self.monsters.stats(), "coins": self.coins.stats()}
+
+    def survival_time(self):
+        end = self.end_time if self.state == GAME_OVER else self.get_ticks()
+        return end - self.start_time
     
     def draw_timer_and_score(self):
-        font = pygame.font.Font(None, 36)
-        elapsed_time = (pygame.time.get_ticks() - self.start_time) // 1000
-        timer_text = font.render(f"Time: {elapsed_time}s", True, (255, 255, 255))
-        score_text = font.render(f"Score: {self.score}", True, (255, 255, 255))
-        self.window.blit(timer_text, (WIDTH - 200, 10))
-        self.window.blit(score_text, (WIDTH - 200, 50))
+        elapsed_time = (self.get_ticks() - self.start_time) // 1000
+        timer_text = TEXT.render(f"Time: {elapsed_time}s")
+        score_text = TEXT.render(f"Score: {self.score}")
+        timer_rect = self.window.blit(timer_text, (WIDTH - 200, 10))
+        score_rect = self.window.blit(score_text, (WIDTH - 200, 50))
+        return timer_rect, score_rect
     
     def draw_start_screen_part1(self):
-        font = pygame.font.Font(None, 74)
-        title_text = font.render("Robot Payback", True, (255, 255, 255))
+        title_text = TEXT.render("Robot Payback", 74)
         self.window.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, HEIGHT // 4))
-        font = pygame.font.Font(None, 36)
         self.blit_text(self.window, STORY_STRING, (150, 260))
         continue_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
         pygame.draw.rect(self.window, ( 28, 173, 52 ), continue_button)
-        continue_text = font.render("Continue", True, (255, 255, 255))
+        continue_text = TEXT.render("Continue")
         self.window.blit(continue_text, (continue_button.x + 50, continue_button.y + 10))
 
     def draw_start_screen_part2(self):
-        font = pygame.font.Font(None, 36)
-        self.blit_text(self.window, MECHANICS_STRING, (100, 150))        
+        self.blit_text(self.window, MECHANICS_STRING, (100, 150))
         start_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
         pygame.draw.rect(self.window, (28, 173, 52), start_button)
-        start_text = font.render("Start", True, (255, 255, 255))
+        start_text = TEXT.render("Start")
         self.window.blit(start_text, (start_button.x + 50, start_button.y + 10))
     
     def draw_game_over_screen(self):
-        font = pygame.font.Font(None, 74)
-        game_over_text = font.render("Game Over", True, (255, 255, 255))
+        game_over_text = TEXT.render("Game Over", 74)
         self.window.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 4))
         
-        font = pygame.font.Font(None, 36)
         elapsed_time = (self.end_time - self.start_time) // 1000
-        stats_text = font.render(f"Time: {elapsed_time}s, Score: {self.score}", True, (255, 255, 255))
+        stats_text = TEXT.render(f"Time: {elapsed_time}s, Score: {self.score}")
         self.window.blit(stats_text, (WIDTH // 2 - stats_text.get_width() // 2, HEIGHT // 2))
         
         restart_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
         pygame.draw.rect(self.window, (0, 255, 0), restart_button)
-        restart_text = font.render("Restart", True, (0, 0, 0))
+        restart_text = TEXT.render("Restart", color=(0, 0, 0))
         self.window.blit(restart_text, (restart_button.x + 50, restart_button.y + 10))
         
         exit_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 200, 200, 50)
         pygame.draw.rect(self.window, (255, 0, 0), exit_button)
-        exit_text = font.render("Exit", True, (0, 0, 0))
+        exit_text = TEXT.render("Exit", color=(0, 0, 0))
         self.window.blit(exit_text, (exit_button.x + 70, exit_button.y + 10))
     
-    def handle_start_screen_click(self):
-        mouse_pos = pygame.mouse.get_pos()
+    def handle_start_screen_click(self, mouse_pos):
         if self.state == START_SCREEN_PART1:
             continue_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
             if continue_button.collidepoint(mouse_pos):
@@ -242,11 +1411,18 @@ class Game:
         elif self.state == START_SCREEN_PART2:
             start_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
             if start_button.collidepoint(mouse_pos):
-                self.state = GAME_RUNNING
-                self.start_time = pygame.time.get_ticks()
+                self.start_game()
+
+    def start_game(self, session_seed=None):
+        self.state = GAME_RUNNING
+        self.start_time = self.get_ticks()
+        self.timers.reset(self.start_time)
+        self.session_seed = self.seeds.getrandbits(32) if session_seed is None else session_seed
+        self.rng.seed(self.session_seed)
+        if self.recorder is not None:
+            self.recorder.start(self.session_seed, self.sim_clock.tick_rate, self.sim_clock.ticks)
     
-    def handle_game_over_click(self):
-        mouse_pos = pygame.mouse.get_pos()
+    def handle_game_over_click(self, mouse_pos):
         restart_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 100, 200, 50)
         exit_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 200, 200, 50)
         if restart_button.collidepoint(mouse_pos):
@@ -254,113 +1430,230 @@ class Game:
         elif exit_button.collidepoint(mouse_pos):
             self.running = False
     
-    def reset_game(self):
+    def reset_game(self, session_seed=None):
         self.player = Player(WIDTH // 2, HEIGHT // 2)
-        self.monsters = []
-        self.doors = []
-        self.coins = []
+        self.monsters.clear()
+        self.doors.clear()
+        self.coins.clear()
+        self.monster_grid.clear()
         self.monster_limit = INITIAL_MONSTER_LIMIT
-        self.start_time = pygame.time.get_ticks()
         self.score = 0
-        self.state = GAME_RUNNING
+        self.start_game(session_seed)
+
+    def snapshot(self):
+        """The whole game state as compact bytes, restore() brings it back into this or any other Game."""
+        now = self.get_ticks()
+        player = self.player
+        doors, monsters, coins = array("d"), array("d"), array("d")
+        for door in self.doors:
+            doors.extend((door.x, door.y, DOOR_LIFETIME - (now - door.spawn_time)))
+        for m in self.monsters:
+            monsters.extend((m.x, m.y, m.prev_x, m.prev_y, m.dx, m.dy, m.speed, m.behavior == "chase"))
+        for c in self.coins:
+            coins.extend((c.x, c.y, c.prev_x, c.prev_y, c.speed_x, c.speed_y, c.angle, c.collectable))
+        timers = array("q", [timer[1] for timer in self.timers.timers])
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.state, self.sim_clock.ticks, self.start_time,
+            getattr(self, "end_time", 0), self.score, self.monster_limit,
+            -1 if self.session_seed is None else self.session_seed,
+            player.x, player.y, player.prev_x, player.prev_y, player.aim, player.coins,
+            len(timers), len(self.doors), len(self.monsters), len(self.coins))
+        return b"".join((header, timers.tobytes(), doors.tobytes(), monsters.tobytes(), coins.tobytes(),
+                         pack_random(self.rng), pack_random(self.seeds)))
 
+    def restore(self, data):
+        try:
+            (magic, version, state, ticks, start_time, end_time, score, monster_limit, session_seed,
+             x, y, prev_x, prev_y, aim, coins_in_hand,
+             timer_count, door_count, monster_count, coin_count) = SNAPSHOT_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("Not a game snapshot")
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a version %d game snapshot" % SNAPSHOT_VERSION)
+        if timer_count != len(self.timers.timers):
+            raise ValueError("The snapshot has %d timers, this game has %d" % (timer_count, len(self.timers.timers)))
+        offset = SNAPSHOT_HEADER.size
+        due = array("q")
+        due.frombytes(data[offset:offset + timer_count * 8])
+        offset += timer_count * 8
+        for timer, when in zip(self.timers.timers, due):
+            timer[1] = when
+        self.sim_clock.ticks = ticks
+        now = self.get_ticks()
+        self.state, self.start_time, self.end_time = state, start_time, end_time
+        self.score, self.monster_limit = score, monster_limit
+        self.session_seed = None if session_seed == -1 else session_seed
+        player = self.player
+        player.x, player.y, player.prev_x, player.prev_y = x, y, prev_x, prev_y
+        player.aim, player.coins = aim, coins_in_hand
+        self.monster_grid.clear()
+        # Entities already in the pools are overwritten in place, missing ones are made with the game's
+        # generator, whose state is put back right after
+        values, offset = unpack_doubles(data, offset, door_count * DOOR_FIELDS)
+        for door, i in zip(self.doors.resize(door_count, 0, 0, 0), range(0, len(values), DOOR_FIELDS)):
+            door.x, door.y, remaining = values[i:i + DOOR_FIELDS]
+            door.spawn_time = now - (DOOR_LIFETIME - int(remaining))
+        values, offset = unpack_doubles(data, offset, monster_count * MONSTER_FIELDS)
+        for monster, i in zip(self.monsters.resize(monster_count, 0, 0, "random", self.rng),
+                              range(0, len(values), MONSTER_FIELDS)):
+            monster.x, monster.y, monster.prev_x, monster.prev_y, monster.dx, monster.dy, speed, chases = \
+                values[i:i + MONSTER_FIELDS]
+            monster.speed = int(speed)
+            monster.behavior = "chase" if chases else "random"
+        values, offset = unpack_doubles(data, offset, coin_count * COIN_FIELDS)
+        for coin, i in zip(self.coins.resize(coin_count, 0, 0, 0), range(0, len(values), COIN_FIELDS)):
+            coin.x, coin.y, coin.prev_x, coin.prev_y, coin.speed_x, coin.speed_y, coin.angle, collectable = \
+                values[i:i + COIN_FIELDS]
+            coin.collectable = bool(collectable)
+            coin.target = None
+        self.doors.version += 1
+        self.monsters.version += 1
+        self.coins.version += 1
+        offset = unpack_random(self.rng, data, offset)
+        unpack_random(self.seeds, data, offset)
+
+# Entities use __slots__, there are a lot of them and a slotted instance is a fraction of one with a __dict__.
+# The sprite and its hitbox are shared references from ASSETS, never copies.
 class Door:
-    def __init__(self, x, y):
+    __slots__ = ("image", "x", "y", "spawn_time", "alive")
+
+    def __init__(self, x, y, spawn_time):
+        self.image = ASSETS.get("door.png")
+        self.reset(x, y, spawn_time)
+
+    def reset(self, x, y, spawn_time):
         self.x = x
         self.y = y
-        self.spawn_time = pygame.time.get_ticks()
-        self.image = pygame.image.load("door.png")
+        self.spawn_time = spawn_time
     
     def update(self):
         pass
     
-    def timer_expired(self):
-        return pygame.time.get_ticks() - self.spawn_time >= DOOR_LIFETIME
+    def timer_expired(self, now):
+        return now - self.spawn_time >= DOOR_LIFETIME
     
     def draw(self, window):
-        window.blit(self.image, (self.x, self.y))
+        return ATLAS.draw(window, "door.png", (self.x, self.y))
 
 class Player:
+    __slots__ = ("robot", "hitbox", "robot_width", "robot_height", "x", "y", "prev_x", "prev_y", "aim", "coins")
+
     def __init__(self, x, y):
-        self.robot = pygame.image.load("robot.png")
+        self.robot = ASSETS.get("robot.png")
+        self.hitbox = ASSETS.hitbox("robot.png")
         self.robot_width = self.robot.get_width()
         self.robot_height = self.robot.get_height()
         self.x = x - self.robot_width // 2
         self.y = y - self.robot_height // 2
-        self.arrow_angle = 0
+        self.prev_x, self.prev_y = self.x, self.y
+        self.aim = 0  # In aim steps, always kept within one turn
         self.coins = 10
     
-    def update(self):
-        keys = pygame.key.get_pressed()
-        
+    def update(self, keys, scale=1.0):
+        self.prev_x, self.prev_y = self.x, self.y
+        speed = PLAYER_SPEED * scale
         if keys[pygame.K_LEFT] and self.x > 0:
-            self.x -= PLAYER_SPEED
+            self.x -= speed
         if keys[pygame.K_RIGHT] and self.x < WIDTH - self.robot_width:
-            self.x += PLAYER_SPEED
+            self.x += speed
         if keys[pygame.K_UP] and self.y > 0:
-            self.y -= PLAYER_SPEED
+            self.y -= speed
         if keys[pygame.K_DOWN] and self.y < HEIGHT - self.robot_height:
-            self.y += PLAYER_SPEED
+            self.y += speed
         
-        if keys[pygame.K_a]:
-            self.arrow_angle -= ROTATION_SPEED
-        if keys[pygame.K_d]:
-            self.arrow_angle += ROTATION_SPEED
+        if keys[pygame.K_a] or keys[pygame.K_d]:
+            turn = round(ROTATION_SPEED * scale * AIM_STEPS_PER_DEGREE)
+            if keys[pygame.K_a]:
+                self.aim = (self.aim - turn) % AIM_STEPS
+            if keys[pygame.K_d]:
+                self.aim = (self.aim + turn) % AIM_STEPS
+
+    @property
+    def arrow_angle(self):
+        return self.aim / AIM_STEPS_PER_DEGREE
     
-    def draw(self, window):
-        window.blit(self.robot, (self.x, self.y))
+    def draw(self, window, alpha=1.0):
+        x = lerp(self.prev_x, self.x, alpha)
+        y = lerp(self.prev_y, self.y, alpha)
+        sprite_rect = ATLAS.draw(window, "robot.png", (x, y))
         
         # Calculate arrow position
-        arrow_x = self.x + self.robot_width // 2 + ARROW_LENGTH * math.cos(math.radians(self.arrow_angle))
-        arrow_y = self.y + self.robot_height // 2 + ARROW_LENGTH * math.sin(math.radians(self.arrow_angle))
+        cos, sin = AIM_DIRECTIONS[self.aim]
+        arrow_x = x + self.robot_width // 2 + ARROW_LENGTH * cos
+        arrow_y = y + self.robot_height // 2 + ARROW_LENGTH * sin
         
-        pygame.draw.line(window, (255, 255, 255),
-        (self.x + self.robot_width // 2, self.y + self.robot_height // 2),
+        arrow_rect = pygame.draw.line(window, (255, 255, 255),
+        (x + self.robot_width // 2, y + self.robot_height // 2),
         (arrow_x, arrow_y), 3)
+        return sprite_rect.union(arrow_rect)
         
 class Monster:
-    def __init__(self, x, y, behavior):
+    __slots__ = ("image", "hitbox", "x", "y", "prev_x", "prev_y", "speed", "behavior", "dx", "dy", "alive")
+
+    def __init__(self, x, y, behavior, rng=random):
+        self.image = ASSETS.get("monster.png")
+        self.hitbox = ASSETS.hitbox("monster.png")
+        self.reset(x, y, behavior, rng)
+
+    def reset(self, x, y, behavior, rng=random):
         self.x = x
         self.y = y
-        self.speed = random.randint(*MONSTER_SPEED_RANGE)
+        self.prev_x, self.prev_y = x, y
+        self.speed = rng.randint(*MONSTER_SPEED_RANGE)
         self.behavior = behavior
-        self.image = pygame.image.load("monster.png")
-        self.dx = random.choice([-1, 1]) * self.speed
-        self.dy = random.choice([-1, 1]) * self.speed
+        self.dx = rng.choice([-1, 1]) * self.speed
+        self.dy = rng.choice([-1, 1]) * self.speed
     
-    def update(self, player_x, player_y):
+    def update(self, player_x, player_y, scale=1.0, field=None):
         if self.behavior == "chase":
-            if self.x < player_x:
-                self.x += self.speed
-            elif self.x > player_x:
-                self.x -= self.speed
-            if self.y < player_y:
-                self.y += self.speed
-            elif self.y > player_y:
-                self.y -= self.speed
+            speed = self.speed * scale
+            step = field.direction(self.x, self.y) if field is not None else None
+            if step is not None:
+                self.x += step[0] * speed
+                self.y += step[1] * speed
+            else:
+                if self.x < player_x:
+                    self.x += speed
+                elif self.x > player_x:
+                    self.x -= speed
+                if self.y < player_y:
+                    self.y += speed
+                elif self.y > player_y:
+                    self.y -= speed
         else:
             if self.x <= 0 or self.x >= WIDTH - 40:
                 self.dx = -self.dx
             if self.y <= 0 or self.y >= HEIGHT - 40:
                 self.dy = -self.dy
-            self.x += self.dx
-            self.y += self.dy
+            self.x += self.dx * scale
+            self.y += self.dy * scale
     
-    def draw(self, window):
-        window.blit(self.image, (self.x, self.y))
+    def draw(self, window, alpha=1.0):
+        return ATLAS.draw(window, "monster.png", (lerp(self.prev_x, self.x, alpha), lerp(self.prev_y, self.y, alpha)))
 
 class Coin:
-    def __init__(self, x, y, angle):
+    __slots__ = ("image", "hitbox", "x", "y", "prev_x", "prev_y", "angle", "speed_x", "speed_y", "target", "collectable",
+                 "alive")
+
+    def __init__(self, x, y, angle, collectable=True):
+        self.image = ASSETS.get("coin.png")
+        self.hitbox = ASSETS.hitbox("coin.png")
+        self.reset(x, y, angle, collectable)
+
+    def reset(self, x, y, angle, collectable=True):
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y
         self.angle = angle
-        self.speed_x = COIN_SPEED * math.cos(math.radians(angle))
-        self.speed_y = COIN_SPEED * math.sin(math.radians(angle))
-        self.image = pygame.image.load("coin.png")
+        cos, sin = aim_direction(angle)
+        self.speed_x = COIN_SPEED * cos
+        self.speed_y = COIN_SPEED * sin
+        self.target = None
+        self.collectable = collectable
 
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
+    def update(self, scale=1.0):
+        self.x += self.speed_x * scale
+        self.y += self.speed_y * scale
 
         if self.x <= 0 or self.x >= WIDTH - self.image.get_width():
             self.speed_x = -self.speed_x
@@ -369,7 +1662,7 @@ class Coin:
 
     def check_collision(self, monsters):
         for monster in monsters:
-            if abs(self.x - monster.x) < 20 and abs(self.y - monster.y) < 20:
+            if abs(self.x - monster.x) < HITBOX_SIZE and abs(self.y - monster.y) < HITBOX_SIZE:
                 self.target = monster
                 return True
         return False
@@ -377,14 +1670,31 @@ class Coin:
     def check_collision_with_player(self, player):
         """ Returns True if the coin collides with the player. """
         return (
-            abs(self.x - player.x) < 20 and
-            abs(self.y - player.y) < 20
+            abs(self.x - player.x) < HITBOX_SIZE and
+            abs(self.y - player.y) < HITBOX_SIZE
         )
 
-    def draw(self, window):
-        window.blit(self.image, (self.x, self.y))
+    def draw(self, window, alpha=1.0):
+        return ATLAS.draw(window, "coin.png", (lerp(self.prev_x, self.x, alpha), lerp(self.prev_y, self.y, alpha)))
 
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Robot Survival")
+    parser.add_argument("--headless", action="store_true", help="simulate a game without a window and print its statistics")
+    parser.add_argument("--frames", type=int, default=None, help="stop a headless game after this many frames")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random generator")
+    parser.add_argument("--record", metavar="PATH", help="save the inputs of the last finished game to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="replay a recording headlessly and check its result")
+    parser.add_argument("--profile", metavar="PATH", help="time every phase of the game loop and write the timings to PATH on exit")
+    args = parser.parse_args()
+    if args.replay:
+        matches, result = verify_replay(load_recording(args.replay))
+        print(("Replay matches: " if matches else "Replay differs: ") + str(result))
+    elif args.headless:
+        print(Game(headless=True, seed=args.seed).run_headless(args.frames))
+    else:
+        game = Game(seed=args.seed, record=args.record is not None, profile_path=args.profile)
+        game.run()
+        if args.record and game.recorder.recording and game.recorder.recording["score"] is not None:
+            game.recorder.save(args.record)
\ No newline at end of file
@@ -1,13 +1,536 @@
+import os
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 
 from tmc import points, reflect
 from tmc.utils import load, load_module, reload_module, get_stdout, check_source
 
+exercise = 'src.main'
+
 @points('14.own_game')
 class Part14Test(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_module(exercise, 'en')
+        if isinstance(cls.module, AssertionError):
+            raise cls.module
+
     def test_1_pygame(self):
         pass
 
+    def test_2_assets_loaded_once(self):
+        game = self.module.Game()
+        assets = self.module.ASSETS
+        assets.reset_stats()
+        for _ in range(20):
+            game.spawn_monster(0, 0)
+            game.doors.append(self.module.Door(0, 0, 0))
+            game.shoot_coin()
+        stats = assets.stats()
+        self.assertEqual(stats["loads"], 0, "Spawning entities should not load images from disk")
+        self.assertEqual(stats["misses"], 0)
+        self.assertIs(game.monsters[0].image, game.monsters[-1].image)
+
+    def test_3_spatial_grid_matches_linear_scan(self):
+        import random
+        rng = random.Random(1)
+        monsters = [self.module.Monster(rng.randint(0, 1080), rng.randint(0, 720), "random") for _ in range(300)]
+        grid = self.module.SpatialGrid()
+        grid.rebuild(monsters)
+        for _ in range(300):
+            coin = self.module.Coin(rng.uniform(0, 1080), rng.uniform(0, 720), 0)
+            hit = coin.check_collision(monsters)
+            expected = getattr(coin, "target", None)
+            self.assertEqual(hit, coin.check_collision(grid.query_near(coin.x, coin.y)))
+            if hit:
+                self.assertIs(coin.target, expected)
+        grid.remove(monsters[0])
+        self.assertNotIn(monsters[0], grid.query_near(monsters[0].x, monsters[0].y))
+
+    def test_4_numpy_backend_matches_objects(self):
+        import random
+        trajectories = []
+        for backend in ("objects", "numpy"):
+            random.seed(4)
+            game = self.module.Game(entity_backend=backend)
+            for i in range(40):
+                game.monsters.append(self.module.Monster(random.randint(0, 1040), random.randint(0, 680), random.choice(["random", "chase"])))
+                game.coins.append(self.module.Coin(random.uniform(0, 1040), random.uniform(0, 680), random.randrange(360)))
+            path = []
+            for _ in range(300):
+                game.update_entities()
+                path.append([(m.x, m.y) for m in game.monsters] + [(c.x, c.y) for c in game.coins])
+            trajectories.append(path)
+        self.assertEqual(trajectories[0], trajectories[1])
+        arrays = game.entity_arrays
+        with patch.object(arrays, "load", wraps=arrays.load) as load:
+            for _ in range(3):
+                game.update_entities()
+            self.assertEqual(load.call_count, 0, "The arrays are only loaded again when entities join or leave")
+            game.coins.acquire(100, 100, 0)
+            game.update_entities()
+            self.assertEqual(load.call_count, 1)
+
+    def test_5_headless_game_runs_on_simulated_time(self):
+        import pygame
+        game = self.module.Game(headless=True)
+        self.assertIsNone(game.window)
+        game.input.press(pygame.K_SPACE)
+        game.input.hold(pygame.K_LEFT)
+        game.run_headless(max_frames=1)
+        self.assertEqual(game.player.coins, 9)
+        stats = game.run_headless(max_frames=60 * 12 - 1)
+        self.assertEqual(stats["frames"], 60 * 12 - 1)
+        self.assertEqual(game.get_ticks(), 12000)
+        self.assertEqual(len(game.doors) + len(game.monsters), 1, "A door should spawn after 10 simulated seconds")
+        self.assertGreater(stats["simulated_fps"], 60)
+
+    def test_6_fixed_timestep_is_independent_of_tick_rate(self):
+        positions = []
+        for tick_rate in (60, 120):
+            game = self.module.Game(headless=True, tick_rate=tick_rate)
+            game.coins.append(self.module.Coin(100, 100, 30))
+            game.run_headless(max_frames=tick_rate)
+            self.assertEqual(game.get_ticks(), 1000)
+            positions.append((game.coins[0].x, game.coins[0].y))
+        self.assertAlmostEqual(positions[0][0], positions[1][0], places=6)
+        self.assertAlmostEqual(positions[0][1], positions[1][1], places=6)
+
+    def test_7_rendering_interpolates_between_ticks(self):
+        game = self.module.Game(headless=True)
+        coin = self.module.Coin(100, 100, 0)
+        game.coins.append(coin)
+        game.update_entities()
+        window = MagicMock()
+        coin.draw(window, 0.5)
+        self.assertEqual(window.blit.call_args[0][1], (102.5, 100.0))
+
+    def test_8_dirty_rects_push_only_changed_pixels(self):
+        game = self.module.Game()
+        renderer = game.renderer
+        game.draw()
+        self.assertEqual(renderer.pixels_pushed, 1080 * 720)
+        game.draw()
+        self.assertEqual(renderer.pixels_pushed, 0, "A static start screen should not be presented again")
+        game.start_game()
+        game.draw()
+        game.step()
+        game.draw()
+        self.assertGreater(renderer.pixels_pushed, 0)
+        self.assertLess(renderer.pixels_pushed, 1080 * 720 // 10)
+
+    def test_9_text_is_rendered_once(self):
+        text = self.module.TextCache()
+        first = text.paragraph(self.module.STORY_STRING, 930)
+        self.assertIs(text.paragraph(self.module.STORY_STRING, 930), first)
+        self.assertIs(text.render("Score: 0"), text.render("Score: 0"))
+        stats = text.stats()
+        self.assertEqual(stats["paragraphs"]["hits"], 1)
+        self.assertEqual(stats["surfaces"]["hit_rate"], 0.5)
+        self.assertEqual(len(text.fonts), 1)
+        small = self.module.TextCache(max_surfaces=2)
+        for word in ("a", "b", "c"):
+            small.render(word)
+        self.assertEqual(len(small.surfaces), 2)
+
+    def test_10_recorded_session_replays_identically(self):
+        import pygame
+        import random
+        game = self.module.Game(headless=True, seed=10, record=True)
+        script = random.Random(10)
+        keys = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_a, pygame.K_d]
+        while game.state == self.module.GAME_RUNNING and game.sim_clock.ticks < 60 * 120:
+            if game.sim_clock.ticks % 20 == 0:
+                game.input.held = set(script.sample(keys, 2))
+            if script.random() < 0.02:
+                game.input.press(pygame.K_SPACE)
+            game.handle_events()
+            game.step()
+        if game.state == self.module.GAME_RUNNING:
+            game.game_over()
+        recording = game.recorder.recording
+        matches, result = self.module.verify_replay(recording)
+        self.assertTrue(matches, "Replay ended with %s, recorded %s" % (result, recording))
+        other = self.module.Game(headless=True, seed=10)
+        self.assertEqual(other.session_seed, game.session_seed)
+        for menu_ticks in (1, 4, 7):
+            late = self.module.Game(headless=True, seed=menu_ticks, record=True)
+            for _ in range(menu_ticks):
+                late.sim_clock.tick()
+            late.reset_game()
+            late.input.hold(pygame.K_LEFT, pygame.K_UP)
+            late.run_headless(max_frames=60 * 60)
+            if late.state == self.module.GAME_RUNNING:
+                late.game_over()
+            matches, result = self.module.verify_replay(late.recorder.recording)
+            self.assertTrue(matches, "Replay of a game started on tick %d ended with %s" % (menu_ticks, result))
+
+    def test_11_frame_benchmark_reports_phases(self):
+        bench = load_module('src.bench', 'en')
+        results = bench.bench_frame_suite(frames=5, scenarios={"tiny": (1, 5, 5)})
+        self.assertEqual(set(results["tiny"]), {"update", "collision", "draw", "flip", "frame"})
+        self.assertEqual(bench.compare_to_baseline(results, results), [])
+        slow = {"tiny": {"frame": {"mean_ms": 100.0, "p95_ms": 100.0, "p99_ms": 100.0}}}
+        faster = {"tiny": {"frame": {"mean_ms": 1.0, "p95_ms": 1.0, "p99_ms": 1.0}}}
+        self.assertEqual(len(bench.compare_to_baseline(slow, faster)), 2)
+        self.assertEqual(bench.compare_to_baseline(slow, faster, scale=100.0), [], "A slower machine scales the baseline")
+
+    def test_12_profiler_keeps_a_ring_of_samples(self):
+        profiler = self.module.Profiler(history=4)
+        self.assertIs(profiler.scope("update"), self.module.NULL_SCOPE)
+        self.assertEqual(profiler.rings, {})
+        profiler.enabled = True
+        for value in range(6):
+            profiler.record("update", value)
+        self.assertEqual(profiler.samples("update"), [2, 3, 4, 5])
+        with profiler.scope("draw"):
+            pass
+        self.assertEqual(profiler.summary()["draw"]["samples"], 1)
+        window = self.module.pygame.Surface((1080, 720))
+        self.assertGreater(profiler.draw_overlay(window, {"monsters": 3}).width, 0)
+        profiler.enabled = False
+        profiler.toggle_overlay()
+        self.assertTrue(profiler.enabled)
+        profiler.toggle_overlay()
+        self.assertIs(profiler.scope("update"), self.module.NULL_SCOPE, "Closing the overlay stops the timing again")
+        self.assertEqual(self.module.percentile([4, 1, 3, 2], 0.95), 4)
+
+    def test_13_entity_pool_reuses_released_entities(self):
+        pool = self.module.EntityPool(self.module.Coin)
+        coins = [pool.acquire(i * 10, 0, 0) for i in range(5)]
+        pool.release(coins[1])
+        pool.release(coins[3])
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(len(list(pool)), 5, "Released coins stay in place until the pool is compacted")
+        pool.compact()
+        self.assertEqual(list(pool), [coins[0], coins[2], coins[4]])
+        reused = pool.acquire(500, 500, 90)
+        self.assertIn(reused, (coins[1], coins[3]))
+        self.assertEqual((reused.x, reused.y, reused.target), (500, 500, None))
+        stats = pool.stats()
+        self.assertEqual((stats["allocated"], stats["allocations_avoided"], stats["active"]), (5, 1, 4))
+        pool.release(reused)
+        fresh = pool.acquire(0, 0, 0)
+        self.assertIsNot(fresh, reused, "A released entity is not handed out again before the pool is compacted")
+        pool.compact()
+        self.assertEqual(len(list(pool)), len(set(pool)))
+
+    def test_14_swept_collisions_catch_fast_coins(self):
+        game = self.module.Game(headless=True)
+        game.player.x, game.player.y = game.player.prev_x, game.player.prev_y = 900, 600
+        monster = self.module.Monster(500, 100, "random")
+        monster.dx = monster.dy = 0
+        game.monsters.append(monster)
+        coin = self.module.Coin(300, 110, 0)
+        coin.speed_x = 400
+        game.coins.append(coin)
+        game.collision_mode = "point"
+        game.update_entities()
+        game.resolve_collisions()
+        self.assertEqual(game.score, 0, "The point check misses a coin jumping over the monster")
+        coin.x, coin.prev_x = 300, 300
+        game.collision_mode = "swept"
+        game.update_entities()
+        game.resolve_collisions()
+        self.assertEqual(game.score, 1)
+        self.assertEqual(len(game.monsters), 0)
+        shot = self.module.Game(headless=True)
+        shot.shoot_coin()
+        shot.resolve_collisions()
+        self.assertEqual(len(shot.coins), 1, "A coin that was just shot is not picked up again right away")
+
+    def test_15_flow_field_routes_around_obstacles(self):
+        field = self.module.FlowField(obstacles=[(400, 0, 40, 680)])
+        field.update(700, 300)
+        field.update(710, 310)
+        self.assertEqual(field.builds, 1, "The field is only rebuilt when the player changes cell")
+        self.assertIsNone(field.direction(700, 300))
+        self.assertEqual(field.direction(100, 300), (1, 1), "Monsters head for the gap below the wall")
+        monster = self.module.Monster(100, 300, "chase")
+        for _ in range(1000):
+            monster.update(700, 300, field=field)
+        self.assertLess(abs(monster.x - 700) + abs(monster.y - 300), 10)
+        field.update(100, 100)
+        self.assertEqual(field.builds, 2)
+        open_field = self.module.FlowField()
+        open_field.update(110, 600)
+        self.assertIsNone(open_field.direction(100, 300), "Without obstacles chasers steer straight at the player")
+
+    def test_16_batch_sweep_resumes(self):
+        import csv
+        import tempfile
+        batch = load_module('src.batch', 'en')
+        grid = {"DOOR_LIFETIME": [1000, 5000], "MONSTER_SPEED_RANGE": [[4, 6]]}
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "sweep.csv")
+            with open(path, "w", newline="") as file:
+                csv.writer(file).writerow(batch.csv_columns(grid))
+            self.assertEqual(batch.run_sweep(path, grid, ["idle"], runs=2, processes=2, max_seconds=20), 4)
+            self.assertEqual(batch.run_sweep(path, grid, ["idle"], runs=3, processes=2, max_seconds=20), 2)
+            with open(path, newline="") as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual(len({row["run"] for row in rows}), 6)
+        self.assertEqual(len(rows), 6, "An interrupted sweep's header is not written a second time")
+        self.assertEqual({row["MONSTER_SPEED_RANGE"] for row in rows}, {"[4, 6]"})
+        self.assertEqual(self.module.DOOR_LIFETIME, 5000)
+        task = batch.make_tasks(grid, ["idle"], runs=1)[0]
+        first, second = batch.simulate(task, 20), batch.simulate(task, 20)
+        self.assertEqual((first["survival_ms"], first["ticks"]), (second["survival_ms"], second["ticks"]))
+
+    def test_17_environment_steps_games_in_batches(self):
+        env_module = load_module('src.env', 'en')
+        env = env_module.GameEnv(seed=3)
+        observation, info = env.reset()
+        self.assertEqual(observation.shape, (env.observation_size,))
+        shoot = env_module.encode_action(move=1, aim=2, shoot=True)
+        observation, reward, terminated, truncated, info = env.step(shoot)
+        self.assertEqual(env.game.player.coins, 9)
+        self.assertFalse(terminated or truncated)
+        envs = env_module.VectorGameEnv(4, seed=3, max_seconds=1)
+        observations, _ = envs.reset()
+        self.assertEqual(observations.shape, (4, env.observation_size))
+        self.assertTrue((observations[0] == env_module.GameEnv(seed=3).reset()[0]).all())
+        for _ in range(60):
+            observations, rewards, terminated, truncated, info = envs.step([shoot] * 4)
+        self.assertEqual(rewards.shape, (4,))
+        self.assertTrue(truncated.all(), "Games are cut off after max_seconds and reset")
+        self.assertEqual(len(info["final_observation"]), 4)
+        self.assertEqual(envs.envs[0].game.player.coins, 10)
+
+    def test_18_sprite_atlas_draws_layers_in_one_call(self):
+        atlas = self.module.SpriteAtlas()
+        atlas.build()
+        self.assertEqual(atlas.regions["coin.png"].size, (40, 40))
+        self.assertIs(atlas.build(), atlas.surface, "The atlas is packed once")
+        window = self.module.pygame.Surface((1080, 720))
+        monsters = [self.module.Monster(10 * i, 5 * i, "random") for i in range(20)]
+        rects = atlas.draw_layer(window, "monster.png", self.module.interpolated(monsters, 1.0))
+        self.assertEqual(rects, [monster.draw(window) for monster in monsters])
+        mock_window = MagicMock()
+        atlas.draw_layer(mock_window, "coin.png", [(0, 0), (50, 50)])
+        self.assertEqual(mock_window.blits.call_count, 1)
+        self.assertEqual(mock_window.blit.call_count, 0)
+
+    def test_19_aim_stays_within_one_turn(self):
+        import pygame
+        angles = []
+        for tick_rate in (60, 120):
+            game = self.module.Game(headless=True, tick_rate=tick_rate)
+            game.input.hold(pygame.K_d)
+            game.run_headless(max_frames=tick_rate * 4)
+            angles.append(game.player.arrow_angle)
+        self.assertEqual(angles, [(3 * 60 * 4) % 360] * 2)
+        game.input.held = {pygame.K_a}
+        game.run_headless(max_frames=1000)
+        self.assertTrue(0 <= game.player.aim < self.module.AIM_STEPS)
+        with patch.object(self.module.math, "cos") as cos:
+            game.shoot_coin()
+            game.player.draw(pygame.Surface((1080, 720)))
+        cos.assert_not_called()
+        coin = game.coins[-1]
+        cos, sin = self.module.aim_direction(game.player.arrow_angle)
+        self.assertEqual((coin.speed_x, coin.speed_y), (5 * cos, 5 * sin))
+
+    def test_20_snapshot_restores_the_whole_game(self):
+        import pygame
+        import random
+
+        def play(game, script, ticks):
+            for _ in range(ticks):
+                if script.random() < 0.05:
+                    game.input.held = set(script.sample([pygame.K_LEFT, pygame.K_UP, pygame.K_DOWN, pygame.K_d], 2))
+                if script.random() < 0.03:
+                    game.shoot_coin()
+                game.step()
+
+        game = self.module.Game(headless=True, seed=20)
+        play(game, random.Random(1), 60 * 25)
+        data = game.snapshot()
+        self.assertLess(len(data), 8000)
+        held = set(game.input.held)
+        play(game, random.Random(2), 60 * 20)
+        copy = self.module.Game(headless=True, seed=99, entity_backend="numpy")
+        copy.restore(data)
+        copy.input.held = held
+        self.assertEqual(copy.snapshot(), data)
+        play(copy, random.Random(2), 60 * 20)
+        self.assertEqual(copy.snapshot(), game.snapshot())
+        with self.assertRaises(ValueError):
+            copy.restore(b"nope")
+
+    def test_21_import_does_not_start_pygame(self):
+        import subprocess
+        import sys
+        script = ("import main, pygame; before = (pygame.display.get_init(), pygame.font.get_init()); main.Game(); "
+                  "print(before, pygame.display.get_init(), pygame.font.get_init(), pygame.mixer.get_init())")
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.join(os.path.dirname(__file__), "..", "src"),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split("\n")[-2], "(False, False) True True None")
+
+    def test_22_entities_are_slotted_and_share_sprites(self):
+        coins = [self.module.Coin(0, 0, 0), self.module.Coin(5, 5, 90)]
+        for entity in coins + [self.module.Door(0, 0, 0), self.module.Monster(0, 0, "chase"), self.module.Player(0, 0)]:
+            self.assertFalse(hasattr(entity, "__dict__"), type(entity).__name__)
+        self.assertIs(coins[0].image, coins[1].image)
+        bench = load_module('src.bench', 'en')
+        rows = bench.bench_memory(counts=(200,))
+        self.assertEqual([row["type"] for row in rows], ["door", "monster", "coin"])
+        for row in rows:
+            self.assertLess(row["bytes_per_entity"], bench.ENTITY_BYTES_BUDGET, row["type"])
+
+    def test_23_parallel_runner_merges_worker_results(self):
+        import io
+        import json
+        import sys
+        import tempfile
+        from tmc import result as tmc_result
+        from tmc.runner import TMCTestRunner
+        source = ("import unittest\nfrom tmc import points\n\n@points('1.sample')\nclass SampleTest(unittest.TestCase):\n"
+                  "    def test_a(self):\n        pass\n    @points('1.extra')\n    def test_b(self):\n        self.fail('no')\n"
+                  "    def test_c(self):\n        pass\n    def test_d(self):\n        raise ValueError('broken')\n")
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "sample_parallel_tests.py"), "w") as file:
+                file.write(source)
+            writer = tmc_result.ResultWriter(os.path.join(folder, "results.json"))
+            sys.path.insert(0, folder)
+            try:
+                loader = unittest.TestLoader()
+                tests = list(loader.loadTestsFromName("sample_parallel_tests.SampleTest"))
+                suite = unittest.TestSuite(tests[:2] + [loader.loadTestsFromName("no_such_sample_module")] + tests[2:])
+                with patch('tmc.result.writer', writer):
+                    outcome = TMCTestRunner(stream=io.StringIO(), processes=2).run(suite)
+            finally:
+                sys.path.remove(folder)
+                sys.modules.pop("sample_parallel_tests", None)
+            with open(writer.path, encoding="utf8") as file:
+                merged = json.load(file)
+            with open(writer.stream_path, encoding="utf8") as file:
+                self.assertEqual([json.loads(line) for line in file], merged)
+        self.assertEqual((outcome.testsRun, len(outcome.failures), len(outcome.errors)), (5, 1, 2))
+        self.assertEqual([(result["name"].split(".")[-1], result["status"]) for result in merged],
+                         [("test_a", "passed"), ("test_b", "failed"), ("no_such_sample_module", "errored"),
+                          ("test_c", "passed"), ("test_d", "errored")], "Tests run by the parent keep their place")
+        self.assertEqual([result["points"] for result in merged][:2], [["1.sample"], ["1.extra", "1.sample"]])
+        self.assertEqual(merged[4]["message"], "broken")
+
+    def test_24_results_stream_survives_a_crash(self):
+        import json
+        import tempfile
+        from tmc import result as tmc_result
+        results = [{"name": "t%d" % i, "status": "passed", "message": "ä", "passed": True, "points": ["1.1"],
+                    "backtrace": []} for i in range(3)]
+        with tempfile.TemporaryDirectory() as folder:
+            writer = tmc_result.ResultWriter(os.path.join(folder, "results.json"))
+            for details in results:
+                writer.write(details)
+            with open(writer.stream_path, encoding="utf8") as file:
+                self.assertEqual(len(file.readlines()), 3, "Every result is on disk as soon as it is written")
+            writer.file.write('{"name": "t3", "sta')
+            writer.close()
+            self.assertEqual(tmc_result.compact(writer.stream_path, writer.path), 3)
+            with open(writer.path, encoding="utf8") as file:
+                self.assertEqual(file.read(), json.dumps(results, ensure_ascii=False))
+
+    def test_25_points_are_discovered_from_the_source(self):
+        import sys
+        import tempfile
+        from tmc import discovery
+        static = ("import unittest\nfrom tmc import points as p\n\n@p('2.suite')\nclass StaticTest(unittest.TestCase):\n"
+                  "    @p('2.one', '2.two', '2.one')\n    def test_b(self):\n        pass\n    def test_a(self):\n        pass\n"
+                  "    def helper(self):\n        pass\n")
+        inherited = ("from tmc import points\nfrom points_base import BaseTest\n\n@points('3.suite', '3.suite')\n"
+                     "class InheritedTest(BaseTest):\n    pass\n")
+        base = "import unittest\n\nclass BaseTest(unittest.TestCase):\n    def test_base(self):\n        pass\n"
+        with tempfile.TemporaryDirectory() as folder:
+            for name, source in (("test_points_static", static), ("test_points_inherited", inherited),
+                                 ("points_base", base)):
+                with open(os.path.join(folder, name + ".py"), "w") as file:
+                    file.write(source)
+            try:
+                with patch('tmc.discovery.scan_source', wraps=discovery.scan_source) as scan:
+                    found = discovery.discover_points(folder)
+                    self.assertEqual(scan.call_count, 2)
+                    self.assertEqual(discovery.discover_points(folder), found)
+                    self.assertEqual(scan.call_count, 2, "Unchanged files are not parsed again")
+                    os.utime(os.path.join(folder, "test_points_static.py"), (0, 0))
+                    discovery.discover_points(folder)
+                    self.assertEqual(scan.call_count, 2, "A new mtime alone does not mean new contents")
+            finally:
+                sys.path.remove(folder)
+                for name in ("test_points_static", "test_points_inherited", "points_base"):
+                    sys.modules.pop(name, None)
+        self.assertEqual(found, {
+            "test_points_static.StaticTest.test_a": ["2.suite"],
+            "test_points_static.StaticTest.test_b": ["2.one", "2.two", "2.suite"],
+            "test_points_inherited.InheritedTest.test_base": ["3.suite"],
+            "points_base.BaseTest.test_base": [],
+        }, "The imported base class is loaded from the inheriting module too, like discover does")
+
+    def test_26_recursion_detector_watches_calls_only(self):
+        import sys
+
+        def factorial(n):
+            return 1 if n < 2 else n * factorial(n - 1)
+
+        def ping(n):
+            return pong(n)
+
+        def pong(n):
+            return ping(n - 1) if n else 0
+
+        def countdown(n):
+            return countdown(n - 1) if n else 0
+
+        def outer(n):
+            return countdown(n)
+
+        def half(n):
+            return n // 2
+
+        def fails_then_calls(n):
+            try:
+                half(None)
+            except TypeError:
+                pass
+            return half(n)
+
+        cases = [(factorial, True), (ping, True), (outer, True), (fails_then_calls, False), (sum, False)]
+        for backend in ["bdb", "profile", None]:
+            for func, recursive in cases:
+                self.assertEqual(reflect.test_recursion(func, [3] if func is sum else 3, backend=backend), recursive,
+                                 "%s with %s" % (func.__name__, backend))
+            self.assertIsNone(sys.getprofile())
+        self.assertFalse(reflect.test_recursion(outer, 3, targets=[outer]), "Only the targets are watched")
+        self.assertTrue(reflect.test_recursion(outer, 3, targets=[outer, countdown]))
+        state = self.module.Game(headless=True, seed=1)
+        self.assertFalse(reflect.test_recursion(state.step, targets=[self.module]))
+
+    def test_27_source_checks_parse_each_file_once(self):
+        import tempfile
+        import types
+        from tmc import source
+        clean = 'def story():\n    """Starts at the left edge:\nimport nothing\n"""\n    return 1\n\nif __name__ == "__main__":\n    story()\n'
+        story = 'import os\n\nSTORY = """Once\nclass upon a time\n"""\n'
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "exercise.py")
+            with open(path, "w") as file:
+                file.write(clean)
+            module = types.SimpleNamespace(__file__=path)
+            self.assertEqual(check_source(module), (True, ""))
+            self.assertIs(source.parse(path), source.parse(path))
+            with open(path, "w") as file:
+                file.write(story)
+            self.assertEqual(check_source(module), (False, 'STORY = """Once\n'))
+        self.assertEqual(check_source(self.module), (False, 'os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")\n'))
+        player = reflect.Reflect(exercise, "Player")
+        self.assertTrue(player.has_class_in_source())
+        self.assertTrue(player.has_method_in_source("update"))
+        self.assertFalse(player.has_method_in_source("fly"))
+        self.assertEqual(player.list_methods_in_source()[0], "__init__")
+        self.assertFalse(reflect.Reflect(exercise, "Wizard").has_class_in_source())
+
 if __name__ == '__main__':
     unittest.main()
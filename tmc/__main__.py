@@ -1,5 +1,6 @@
 from unittest import TestProgram
 from .runner import TMCTestRunner
+from .result import compact, writer
 import sys
 
 django_defined = False
@@ -28,6 +29,11 @@ if sys.argv.__len__() > 1 and sys.argv[1] == 'available_points':
     TMCTestRunner().available_points()
     sys.exit()
 
+# Rebuilds .tmc_test_results.json from the streamed results of a run that was killed before it could
+if sys.argv.__len__() > 1 and sys.argv[1] == 'compact_results':
+    print(compact(writer.stream_path, writer.path), 'results compacted into', writer.path)
+    sys.exit()
+
 if django_defined:
     settings.TEST_RUNNER = 'tmc.django.TMCDiscoverRunner'
     TestRunner = get_runner(settings)
@@ -35,5 +41,15 @@ if django_defined:
     failures = test_runner.run_tests(["test"])
     sys.exit(bool(failures))
 
+# python -m tmc --processes N runs the tests on N worker processes, 0 means one per core
+processes = 1
+if '--processes' in sys.argv:
+    index = sys.argv.index('--processes')
+    processes = int(sys.argv[index + 1])
+    del sys.argv[index:index + 2]
+
 main = TestProgram
-main(testRunner=TMCTestRunner, module=None, failfast=False, buffer=True)
+if processes == 1:
+    main(testRunner=TMCTestRunner, module=None, failfast=False, buffer=True)
+else:
+    main(testRunner=TMCTestRunner(buffer=True, processes=processes), module=None, failfast=False, buffer=True)
@@ -0,0 +1,157 @@
+from unittest import TestLoader, TestCase
+from .points import _parse_points, _name_test
+from fnmatch import fnmatch
+import ast
+import hashlib
+import json
+import os
+import sys
+
+CACHE_FILE = '.tmc_discovery_cache.json'
+CACHE_VERSION = 1
+TEST_CASE_BASES = ('TestCase', 'unittest.TestCase')
+
+
+def iterate_tests(suite):
+    if isinstance(suite, TestCase):
+        yield suite
+        return
+    for test in suite:
+        yield from iterate_tests(test)
+
+
+def dotted_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        prefix = dotted_name(node.value)
+        return prefix and prefix + '.' + node.attr
+    return None
+
+
+class NeedsImport(Exception):
+    """The points of a file depend on something only running it can tell, like an inherited test."""
+
+
+def points_aliases(tree):
+    """Names the points decorator goes by in a module, e.g. points for `from tmc import points`."""
+    aliases = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module in ('tmc', 'tmc.points'):
+            aliases.update(alias.asname or alias.name for alias in node.names if alias.name == 'points')
+        elif isinstance(node, ast.Import):
+            aliases.update((alias.asname or alias.name) + '.points' for alias in node.names if alias.name == 'tmc')
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                # Test classes imported from another module are run under this one too
+                if alias.name == '*' or alias.name.endswith(('Test', 'Tests')) or \
+                        (alias.name.endswith('TestCase') and not (node.module or '').startswith('unittest')):
+                    raise NeedsImport
+    return aliases
+
+
+def decorator_points(node, aliases):
+    points = []
+    # Decorators are applied from the bottom up, and every one adds its points after the earlier ones
+    for decorator in reversed(node.decorator_list):
+        if isinstance(decorator, ast.Call) and dotted_name(decorator.func) in aliases:
+            if decorator.keywords or not all(isinstance(arg, ast.Constant) and type(arg.value) is str
+                                             for arg in decorator.args):
+                raise NeedsImport
+            # save_points drops a point it already has, also one repeated within the same call
+            for arg in decorator.args:
+                if arg.value not in points:
+                    points.append(arg.value)
+    return points
+
+
+def scan_source(source, module, prefix='test'):
+    """The points of every test in a test module, found from its AST the way _parse_points finds them
+    after the import: the test's own points and then its class's. Raises NeedsImport when that is not enough.
+    """
+    tree = ast.parse(source)
+    aliases = points_aliases(tree)
+    classes = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == 'load_tests':
+            raise NeedsImport
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = [dotted_name(base) for base in node.bases]
+        if not bases or bases == ['object']:
+            continue
+        if not all(base in TEST_CASE_BASES for base in bases):
+            raise NeedsImport
+        classes.append(node)
+    result = {}
+    # The loader goes through the classes and their test methods in alphabetical order
+    for node in sorted(classes, key=lambda node: node.name):
+        suite_points = decorator_points(node, aliases)
+        methods = [item for item in node.body if isinstance(item, ast.FunctionDef) and item.name.startswith(prefix)]
+        for method in sorted(methods, key=lambda method: method.name):
+            name = '%s.%s.%s' % (module, node.name, method.name)
+            result[name] = decorator_points(method, aliases) + suite_points
+    return result
+
+
+def test_files(start, pattern):
+    """Test files the way TestLoader.discover finds them, only packages are searched below start."""
+    for folder, folders, files in os.walk(start):
+        folders[:] = sorted(name for name in folders if os.path.isfile(os.path.join(folder, name, '__init__.py')))
+        for name in sorted(files):
+            if fnmatch(name, pattern) and name.endswith('.py'):
+                path = os.path.join(folder, name)
+                yield path, os.path.splitext(os.path.relpath(path, start))[0].replace(os.sep, '.')
+
+
+def load_cache(path):
+    try:
+        with open(path, encoding='utf8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('files', {}) if cache.get('version') == CACHE_VERSION else {}
+
+
+def imported_points(start, modules):
+    start = os.path.abspath(start)
+    if start not in sys.path:
+        sys.path.insert(0, start)
+    tests = iterate_tests(TestLoader().loadTestsFromNames(modules))
+    return {_name_test(test): _parse_points(test) for test in tests}
+
+
+def discover_points(start='.', pattern='test*.py', cache_file=CACHE_FILE):
+    """Maps every test name to its points without importing the tests where the AST tells enough.
+    Files are scanned again only when their contents change, a file whose mtime changed but whose
+    hash did not is taken from the cache as it is.
+    """
+    cache_path = os.path.join(start, cache_file)
+    cache = load_cache(cache_path)
+    files = {}
+    result = {}
+    needs_import = []
+    for path, module in test_files(start, pattern):
+        stat = os.stat(path)
+        entry = cache.get(path)
+        if entry is None or (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size):
+            with open(path, 'rb') as f:
+                source = f.read()
+            digest = hashlib.sha1(source).hexdigest()
+            if entry is None or entry['sha1'] != digest:
+                try:
+                    entry = {'points': scan_source(source, module)}
+                except (NeedsImport, SyntaxError):
+                    entry = {'points': None}
+            entry = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha1=digest)
+        files[path] = entry
+        if entry['points'] is None:
+            needs_import.append(module)
+        else:
+            result.update(entry['points'])
+    if needs_import:
+        result.update(imported_points(start, needs_import))
+    if files != cache:
+        with open(cache_path, 'w', encoding='utf8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f, ensure_ascii=False)
+    return result
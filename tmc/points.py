@@ -36,10 +36,10 @@ def points(*points):
 def _parse_points(test):
     name = _name_test(test)
     testPoints = point_register['test']
-    points = testPoints[name]
     key = name[:name.rfind('.')]
     suitePoints = point_register['suite'][key]
-    points += suitePoints
+    # A new list, adding to the registered one would repeat the suite points every time a test is parsed
+    points = testPoints[name] + suitePoints
     return points
 
 
@@ -1,6 +1,9 @@
 import importlib
+import importlib.util
 from bdb import Bdb
 import sys
+import types
+from .source import parse
 
 class RecursionDetected(Exception):
     pass
@@ -22,9 +25,119 @@ class RecursionDetector(Bdb):
     def user_return(self, frame, return_value):
         self.stack.remove(frame.f_code)
 
-def test_recursion(func: callable, *args):
-    detector = RecursionDetector()
-    detector.set_trace()
+# Recursion checks used to run under RecursionDetector, whose Bdb tracer calls back into Python on every line.
+# RecursionWatcher only hears about calls and returns: through sys.monitoring (PEP 669) where the interpreter
+# has it, which can also watch just the target code objects, and through sys.setprofile before that.
+MONITORING = hasattr(sys, 'monitoring')
+TOOL_NAME = 'tmc.reflect'
+
+def target_codes(targets):
+    """Code objects of the target functions, methods of target classes and functions of target modules,
+    nested functions included."""
+    codes = {}
+    seen = set()
+    pending = list(targets)
+    while pending:
+        target = pending.pop()
+        if id(target) in seen or target is None:
+            continue
+        seen.add(id(target))
+        if isinstance(target, types.CodeType):
+            codes[id(target)] = target
+            pending += [const for const in target.co_consts if isinstance(const, types.CodeType)]
+        elif isinstance(target, types.ModuleType):
+            pending += [value for value in vars(target).values() if getattr(value, '__module__', None) == target.__name__]
+        elif isinstance(target, type):
+            pending += vars(target).values()
+        elif isinstance(target, property):
+            pending += [target.fget, target.fset, target.fdel]
+        elif hasattr(target, '__func__'):
+            pending.append(target.__func__)
+        elif isinstance(target, types.FunctionType):
+            pending.append(target.__code__)
+    return codes
+
+class RecursionWatcher:
+    """Raises RecursionDetected when a watched function is entered while it is still running.
+    Watches every Python function when codes is None."""
+    def __init__(self, codes=None):
+        self.codes = codes
+        self.active = set()
+        self.monitoring = False
+
+    def enter(self, code, offset=None):
+        if self.codes is None or id(code) in self.codes:
+            if id(code) in self.active:
+                raise RecursionDetected
+            self.active.add(id(code))
+
+    def leave(self, code, offset=None, value=None):
+        self.active.discard(id(code))
+
+    def profile(self, frame, event, arg):
+        if event == 'call':
+            self.enter(frame.f_code)
+        elif event == 'return':
+            self.leave(frame.f_code)
+
+    def start(self, backend=None):
+        backend = backend or ('monitoring' if MONITORING else 'profile')
+        if backend == 'monitoring':
+            try:
+                self.start_monitoring()
+                return
+            except ValueError:
+                # Every tool id is taken, e.g. by a debugger and coverage
+                pass
+        sys.setprofile(self.profile)
+
+    def start_monitoring(self):
+        monitoring = sys.monitoring
+        self.tool = monitoring.PROFILER_ID
+        monitoring.use_tool_id(self.tool, TOOL_NAME)
+        self.monitoring = True
+        events = monitoring.events
+        calls = events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+        for event in (events.PY_START, events.PY_RESUME):
+            monitoring.register_callback(self.tool, event, self.enter)
+        for event in (events.PY_RETURN, events.PY_YIELD, events.PY_UNWIND):
+            monitoring.register_callback(self.tool, event, self.leave)
+        if self.codes is None:
+            monitoring.set_events(self.tool, calls | events.PY_UNWIND)
+        else:
+            # Exceptions leaving a frame can only be watched globally, leave() is cheap for the others
+            monitoring.set_events(self.tool, events.PY_UNWIND)
+            for code in self.codes.values():
+                monitoring.set_local_events(self.tool, code, calls)
+
+    def stop(self):
+        if not self.monitoring:
+            sys.setprofile(None)
+            return
+        monitoring = sys.monitoring
+        monitoring.set_events(self.tool, 0)
+        for code in (self.codes or {}).values():
+            monitoring.set_local_events(self.tool, code, 0)
+        monitoring.free_tool_id(self.tool)
+        self.monitoring = False
+
+def test_recursion(func: callable, *args, targets=None, backend=None):
+    """True if func(*args) enters a function again before it has returned.
+    targets narrows the watch down to some functions, classes or modules, e.g. targets=[module].
+    backend is 'monitoring', 'profile' or 'bdb', by default the fastest one this interpreter has."""
+    if backend == 'bdb':
+        detector = RecursionDetector()
+        detector.set_trace()
+        try:
+            func(*args)
+        except RecursionDetected:
+            return True
+        else:
+            return False
+        finally:
+            sys.settrace(None)
+    watcher = RecursionWatcher(None if targets is None else target_codes(targets))
+    watcher.start(backend)
     try:
         func(*args)
     except RecursionDetected:
@@ -32,7 +145,7 @@ def test_recursion(func: callable, *args):
     else:
         return False
     finally:
-        sys.settrace(None)
+        watcher.stop()
 
 class Reflect:
     def __init__(self, modulename:str = "", classname:str = ""):
@@ -89,3 +202,22 @@ class Reflect:
 
     def list_public_members(self):
         return [x for x in dir(self.__obj) if not x.startswith("_")]
+
+    def source(self):
+        """The parsed source of the module, None if it cannot be found or parsed. Does not import the module."""
+        try:
+            return parse(importlib.util.find_spec(self.__modulename).origin)
+        except Exception:
+            return None
+
+    def has_class_in_source(self):
+        tree = self.source()
+        return tree is not None and tree.has_class(self.__classname)
+
+    def list_methods_in_source(self):
+        """Methods written in the class body itself, inherited ones are not included."""
+        tree = self.source()
+        return tree.methods(self.__classname) if tree is not None else []
+
+    def has_method_in_source(self, method: str):
+        return method in self.list_methods_in_source()
@@ -2,9 +2,87 @@ from unittest.runner import TextTestResult
 from .points import _parse_points, _name_test
 import atexit
 import json
+import os
+import time
 import traceback
 
-results = []
+RESULTS_FILE = '.tmc_test_results.json'
+FSYNC_EVERY = 50  # Results written between two fsyncs of the stream, at most FSYNC_SECONDS apart
+FSYNC_SECONDS = 1.0
+
+
+class ResultWriter:
+    """Streams test results as JSON Lines next to the results file while the tests run.
+    Every line is flushed right away, so `tail -f .tmc_test_results.jsonl` shows progress live,
+    and fsynced in batches, so a crash loses at most the last batch. finish() compacts the lines
+    into the results file.
+    """
+
+    def __init__(self, path=RESULTS_FILE):
+        self.path = path
+        self.stream_path = os.path.splitext(path)[0] + '.jsonl'
+        self.file = None
+        self.pending = 0
+        self.synced_at = 0.0
+
+    def open(self):
+        self.close()
+        # A results file of an earlier run must not pass for this one if this one crashes
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.file = open(self.stream_path, 'w', encoding='utf8')
+        self.synced_at = time.monotonic()
+
+    def write(self, details):
+        if self.file is None:
+            self.open()
+        self.file.write(json.dumps(details, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= FSYNC_EVERY or time.monotonic() - self.synced_at >= FSYNC_SECONDS:
+            self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.synced_at = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        if self.file is not None:
+            self.close()
+            compact(self.stream_path, self.path)
+
+
+def compact(stream_path, path):
+    """Writes the results streamed to stream_path into path as one JSON list and returns how many there were.
+    The lines are copied as they are, which gives the same bytes as json.dump of the whole list. A last line
+    without its newline was cut off by a crash and is left out.
+    """
+    count = 0
+    with open(stream_path, encoding='utf8') as lines, open(path + '.tmp', 'w', encoding='utf8') as f:
+        f.write('[')
+        for line in lines:
+            if not line.endswith('\n'):
+                break
+            f.write(', ' if count else '')
+            f.write(line[:-1])
+            count += 1
+        f.write(']')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+    return count
+
+
+writer = ResultWriter()
+# Results of a run that ends without stopTestRun, e.g. through exit() in a test, still get compacted
+atexit.register(writer.finish)
 
 
 class TMCResult(TextTestResult):
@@ -12,6 +90,14 @@ class TMCResult(TextTestResult):
     def __init__(self, stream, descriptions, verbosity):
         super(TMCResult, self).__init__(stream, descriptions, verbosity)
 
+    def startTestRun(self):
+        super(TMCResult, self).startTestRun()
+        writer.open()
+
+    def stopTestRun(self):
+        super(TMCResult, self).stopTestRun()
+        writer.finish()
+
     def startTest(self, test):
         super(TMCResult, self).startTest(test)
 
@@ -43,10 +129,7 @@ class TMCResult(TextTestResult):
             'points': points,
             'backtrace': backtrace
         }
-        results.append(details)
+        self.writeResult(details)
 
-    # TODO: Do not do this if not using TMCTestRunner
-    @atexit.register
-    def write_output():
-        with open('.tmc_test_results.json', 'w', encoding='utf8') as f:
-            json.dump(results, f, ensure_ascii=False)
+    def writeResult(self, details):
+        writer.write(details)
@@ -1,36 +1,164 @@
 from unittest import TextTestRunner, TestLoader
+from unittest.runner import _WritelnDecorator
 from .result import TMCResult
-from .points import _parse_points, _name_test
-from itertools import chain
+from .discovery import discover_points, iterate_tests
+from concurrent.futures import ProcessPoolExecutor
+import io
 import json
+import multiprocessing
+import os
+import signal
 
 
 class TMCTestRunner(TextTestRunner):
     """A test runner for TMC exercises.
+    With processes > 1 the tests are sharded over a pool of worker processes.
     """
 
     resultclass = TMCResult
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, processes=1, **kwargs):
         super(TMCTestRunner, self).__init__(*args, **kwargs)
+        self.processes = processes or os.cpu_count() or 1
 
     def run(self, test):
         print('Running tests with some TMC magic...')
+        if self.processes > 1:
+            test = ParallelSuite(test, self.processes, self.verbosity)
         return super(TMCTestRunner, self).run(test)
 
     def available_points(self):
-        testLoader = TestLoader()
-        tests = testLoader.discover('.', 'test*.py', None)
-        try:
-            tests = list(chain(*chain(*tests._tests)))
-        except Exception as error:
-            print("Received following Exception:", error)
-            tests.debug()
-
-        points = map(_parse_points, tests)
-        names = map(_name_test, tests)
-
-        result = dict(zip(names, points))
+        result = discover_points('.', 'test*.py')
 
         with open('.available_points.json', 'w') as f:
             json.dump(result, f, ensure_ascii=False)
+
+
+class RemoteTest:
+    """Stands in for a test that ran in a worker, the parent only needs it for reporting."""
+
+    def __init__(self, test):
+        self.name = str(test)
+        self.description = test.shortDescription()
+        self.test_id = test.id()
+
+    def __str__(self):
+        return self.name
+
+    def id(self):
+        return self.test_id
+
+    def shortDescription(self):
+        return self.description
+
+
+class ParallelSuite:
+    """Runs the tests of a suite on worker processes and merges what they report into one result.
+    Shards are contiguous runs of tests in discovery order and are merged in that order. Tests that
+    cannot be loaded by name run in the parent at their own place in that order, so the output and
+    .tmc_test_results.json list the tests the same way as a serial run.
+    """
+
+    def __init__(self, suite, processes, verbosity=1):
+        self.processes = processes
+        self.verbosity = verbosity
+        # Discovery order as groups of test names and, between them, tests the parent runs itself
+        self.plan = [[]]
+        for test in iterate_tests(suite):
+            # Import errors and such come as tests of unittest.loader, they cannot be loaded again by name
+            if test.__class__.__module__.startswith('unittest'):
+                self.plan += [test, []]
+            else:
+                self.plan[-1].append(test.id())
+
+    def shards(self):
+        """Splits every group of names into shards, a shard never reaches over a test run by the parent."""
+        count = sum(len(step) for step in self.plan if isinstance(step, list))
+        size = max(1, -(-count // (self.processes * 4)))
+        plan = []
+        for step in self.plan:
+            if isinstance(step, list):
+                plan += [step[start:start + size] for start in range(0, len(step), size)]
+            else:
+                plan.append(step)
+        return plan
+
+    def __call__(self, result):
+        plan = self.shards()
+        tasks = [(names, result.failfast, result.buffer, self.verbosity) for names in plan if isinstance(names, list)]
+        if not tasks:
+            for test in plan:
+                test(result)
+            return result
+        # Spawned workers start without the parent's pygame state, each one gets its own SDL dummy drivers.
+        # Unlike multiprocessing.Pool the executor's workers are not daemons, so tests may start processes too.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(min(self.processes, len(tasks)), context, init_worker) as executor:
+            try:
+                outcomes = executor.map(run_shard, tasks)
+                for step in plan:
+                    if isinstance(step, list):
+                        merge(result, next(outcomes))
+                    else:
+                        step(result)
+                    if result.shouldStop:
+                        break
+            finally:
+                executor.shutdown(cancel_futures=True)
+        return result
+
+
+def init_worker():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # The parent handles Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ShardResult(TMCResult):
+    """Keeps the results of a worker for the parent, which is the only one writing them out."""
+
+    def __init__(self, stream, descriptions, verbosity):
+        super(ShardResult, self).__init__(stream, descriptions, verbosity)
+        self.details = []
+
+    def writeResult(self, details):
+        self.details.append(details)
+
+
+def run_shard(task):
+    names, failfast, buffer, verbosity = task
+    stream = io.StringIO()
+    result = ShardResult(_WritelnDecorator(stream), True, verbosity)
+    result.failfast = failfast
+    result.buffer = buffer
+    TestLoader().loadTestsFromNames(names)(result)
+
+    def remote(pairs):
+        return [(RemoteTest(test), text) for test, text in pairs]
+
+    return {
+        'tests_run': result.testsRun,
+        'failures': remote(result.failures),
+        'errors': remote(result.errors),
+        'skipped': remote(result.skipped),
+        'expected_failures': remote(result.expectedFailures),
+        'unexpected_successes': [RemoteTest(test) for test in result.unexpectedSuccesses],
+        'results': result.details,
+        'output': stream.getvalue(),
+    }
+
+
+def merge(result, outcome):
+    result.testsRun += outcome['tests_run']
+    result.failures += outcome['failures']
+    result.errors += outcome['errors']
+    result.skipped += outcome['skipped']
+    result.expectedFailures += outcome['expected_failures']
+    result.unexpectedSuccesses += outcome['unexpected_successes']
+    for details in outcome['results']:
+        result.writeResult(details)
+    result.stream.write(outcome['output'])
+    result.stream.flush()
+    if result.failfast and (outcome['failures'] or outcome['errors']):
+        result.stop()
@@ -0,0 +1,77 @@
+import ast
+import os
+
+# path: (mtime_ns, size, SourceTree), so the checks of a whole test run parse every file once
+_trees = {}
+
+
+class SourceTree:
+    """The parsed source of one module, with the structural questions tests ask about it."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.lines = source.splitlines(True)
+        self.tree = ast.parse(source, path)
+        self.classes = {node.name: node for node in self.tree.body if isinstance(node, ast.ClassDef)}
+        self.functions = {node.name: node for node in self.tree.body
+                          if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+        self.code = self.find_top_level_code()
+
+    def line(self, node):
+        return self.lines[node.lineno - 1]
+
+    def top_level_code(self):
+        """Top-level statements other than imports, functions, classes, the module docstring and
+        the `if __name__ == "__main__":` block, in source order."""
+        return list(self.code)
+
+    def find_top_level_code(self):
+        code = []
+        for index, node in enumerate(self.tree.body):
+            if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+                    and isinstance(node.value.value, str):
+                continue
+            if is_main_check(node):
+                continue
+            code.append(node)
+        return code
+
+    def has_class(self, name):
+        return name in self.classes
+
+    def has_function(self, name):
+        return name in self.functions
+
+    def methods(self, classname):
+        """Names of the methods defined in the class body, in source order, an empty list if there is no such class."""
+        node = self.classes.get(classname)
+        if node is None:
+            return []
+        return [item.name for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+    def has_method(self, classname, name):
+        return name in self.methods(classname)
+
+
+def is_main_check(node):
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
+    test = node.test
+    return isinstance(test.left, ast.Name) and test.left.id == '__name__' and len(test.ops) == 1 \
+        and isinstance(test.ops[0], ast.Eq) and isinstance(test.comparators[0], ast.Constant) \
+        and test.comparators[0].value == '__main__'
+
+
+def parse(path):
+    """The SourceTree of the file at path, parsed again only when the file's mtime or size changes."""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _trees.get(path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+    with open(path, encoding='utf8') as f:
+        tree = SourceTree(path, f.read())
+    _trees[path] = key + (tree,)
+    return tree
@@ -3,6 +3,8 @@ import sys
 
 from unittest.mock import MagicMock
 
+from .source import parse
+
 _stdout_pointer = 0
 
 
@@ -95,6 +97,8 @@ def any_contains(needle, haystacks):
 def check_source(module):
     """
     Check that module doesn't have any globals.
+    Only imports, functions, classes, a module docstring and the if __name__ == "__main__" block
+    may be at the top level. The module is parsed once per change of its file, see tmc.source.
     Example::
         def test_no_global(self):
             result, line = check_source(self.module)
@@ -104,27 +108,14 @@ def check_source(module):
         source = module.__file__
     except Exception:
         raise Exception('Varmista, että koodin suoritus onnistuu')
-    allowed = [
-        "import ",
-        "from ",
-        "def ",
-        "class ",
-        " ",
-        "\t",
-        "#",
-        "if __name__",
-        "@",
-    ]
-    with open(source) as file:
-        for line in file.readlines():
-            if line.strip() == "":
-                continue
-            for prefix in allowed:
-                if line.startswith(prefix):
-                    break
-            else:
-                return (False, line)
-        return (True, "")
+    try:
+        tree = parse(source)
+    except SyntaxError as error:
+        return (False, error.text or "")
+    code = tree.top_level_code()
+    if code:
+        return (False, tree.line(code[0]))
+    return (True, "")
 
 
 def remove_extra_whitespace(mj):